@@ -0,0 +1,113 @@
+from array import array #compact arrays of plain C numbers instead of lists of Python objects
+from math import inf as infinity
+from queues import Queue, Stack, MutableMinHeap
+from graph import weight_getter
+
+"""A networkx graph stores every node in a dict of dicts, so each step of a traversal hashes the City named tuples and builds a new list of neighbors. The compact graph
+below is built once from the load_graph output and gives every node an integer id instead. All the neighbors are kept back to back in one array, in CSR (compressed sparse
+row) layout: the neighbors of node i are neighbors[offsets[i]:offsets[i + 1]], and weights holds the already converted edge weights at the same positions"""
+
+class CompactGraph:
+    def __init__(self, nodes, offsets, neighbors, weights):
+        self.nodes = nodes #node objects (e.g. City) indexed by their integer id
+        self.ids = {node: node_id for node_id, node in enumerate(nodes)} #the reverse mapping, only needed when entering or leaving the compact world
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+
+    @classmethod
+    def from_graph(cls, graph, weight_factory=None, order_by=None):
+        """converts a networkx graph once; weight_factory turns the dictionary of edge attributes into a number or names an already converted attribute (every edge 
+        weighs 1 without it), and order_by sorts each row of neighbors up front so the traversals never have to sort them again"""
+        weight_factory = weight_getter(weight_factory) if weight_factory else None
+        nodes = list(graph.nodes)
+        ids = {node: node_id for node_id, node in enumerate(nodes)}
+        offsets = array("q", [0])
+        neighbors = array("q")
+        weights = array("d")
+        for node in nodes:
+            row = list(graph[node].items())
+            if order_by:
+                row.sort(key=lambda item: order_by(item[0]))
+            for neighbor, attributes in row:
+                neighbors.append(ids[neighbor])
+                weights.append(weight_factory(attributes) if weight_factory else 1.0)
+            offsets.append(len(neighbors))
+        return cls(nodes, offsets, neighbors, weights)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def neighbors_of(self, node_id):
+        """a slice of the neighbor ids, no hashing involved"""
+        return self.neighbors[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def edges_of(self, node_id):
+        """pairs of (neighbor id, weight) for the given node"""
+        start, end = self.offsets[node_id], self.offsets[node_id + 1]
+        return zip(self.neighbors[start:end], self.weights[start:end])
+
+"""the traversals below mirror the ones in graph.py but take and yield integer ids; use compact.ids[city] to get the id of a node and compact.nodes[node_id] to get it back"""
+
+def breadth_first_traverse(compact, source):
+    queue = Queue(source)
+    visited = bytearray(len(compact)) #one byte per node instead of a set of hashed nodes
+    visited[source] = 1
+    offsets, neighbors = compact.offsets, compact.neighbors
+    while queue:
+        yield (node := queue.dequeue())
+        for neighbor in neighbors[offsets[node]:offsets[node + 1]]:
+            if not visited[neighbor]:
+                visited[neighbor] = 1
+                queue.enqueue(neighbor)
+
+def depth_first_traverse(compact, source):
+    stack = Stack(source)
+    visited = bytearray(len(compact))
+    offsets, neighbors = compact.offsets, compact.neighbors
+    while stack:
+        if not visited[node := stack.dequeue()]:
+            yield node
+            visited[node] = 1
+            for neighbor in reversed(neighbors[offsets[node]:offsets[node + 1]]): #LIFO queue, same order as graph.depth_first_traverse
+                stack.enqueue(neighbor)
+
+def retrace(previous, source, destination):
+    """same as graph.retrace but previous is an array of ids where -1 means that the node was never reached"""
+    path = []
+    current = destination
+    while current != source:
+        path.append(current)
+        current = previous[current]
+        if current == -1:
+            return None
+    path.append(source)
+    path.reverse()
+    return path
+
+def dijkstra_shortest_path(compact, source, destination):
+    """Dijkstra's algorithm on the compact graph using the weights converted in from_graph; returns a list of node ids"""
+    size = len(compact)
+    previous = array("q", [-1]) * size
+    distances = array("d", [infinity]) * size
+    visited = bytearray(size)
+    distances[source] = 0
+
+    unvisited = MutableMinHeap()
+    unvisited[source] = 0
+    offsets, neighbors, weights = compact.offsets, compact.neighbors, compact.weights
+
+    while unvisited:
+        node = unvisited.dequeue()
+        if node == destination:
+            break
+        visited[node] = 1
+        for index in range(offsets[node], offsets[node + 1]):
+            neighbor = neighbors[index]
+            if not visited[neighbor]:
+                new_distance = distances[node] + weights[index]
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    previous[neighbor] = node
+
+    return retrace(previous, source, destination)
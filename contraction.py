@@ -0,0 +1,154 @@
+import pickle
+from math import inf as infinity
+from queues import MutableMinHeap
+from graph import weight_getter
+
+"""A contraction hierarchy spends time once, offline, so that every later query is fast. The nodes are contracted (removed) one by one, least important first, and
+whenever removing a node v would make the shortest route between two of its neighbors longer, a shortcut edge u -- w "via v" is added in its place. Afterwards every
+node has a rank (its position in the contraction order), and a shortest path can always be found going only upwards in rank from the source and only upwards from the
+destination, until the two searches meet at the most important node of the path. Those upward searches only touch a tiny part of a road network."""
+
+WITNESS_SETTLE_LIMIT = 64 #a witness search gives up after settling this many nodes; giving up only means an unnecessary shortcut, never a wrong answer
+
+class ContractionHierarchy:
+    def __init__(self, rank, upward):
+        self.rank = rank #node -> position in the contraction order
+        self.upward = upward #node -> {higher ranked neighbor: (weight, via)}, via is the contracted middle node of a shortcut or None for an original edge
+
+    @classmethod
+    def build(cls, graph, weight_factory):
+        """contracts every node of an undirected graph; weight_factory can be a function or the name of a converted edge attribute, just like in graph.py"""
+        weight_factory = weight_getter(weight_factory)
+        adjacency = {node: {} for node in graph.nodes} #the graph that is left, including shortcuts: node -> {neighbor: (weight, via)}
+        for node1, node2, weights in graph.edges(data=True):
+            adjacency[node1][node2] = adjacency[node2][node1] = (weight_factory(weights), None)
+        contracted_neighbors = dict.fromkeys(adjacency, 0)
+
+        def shortcuts_needed(node):
+            """the shortcuts that contracting the node would add: one for every pair of neighbors whose only shortest connection goes through the node"""
+            neighbors = adjacency[node]
+            shortcuts = []
+            for neighbor1, (weight1, _) in neighbors.items():
+                targets = {
+                    neighbor2: weight1 + weight2
+                    for neighbor2, (weight2, _) in neighbors.items() if neighbor2 != neighbor1
+                }
+                if not targets:
+                    continue
+                witnessed = witness_search(adjacency, neighbor1, node, targets)
+                shortcuts.extend(
+                    (neighbor1, neighbor2, cost) for neighbor2, cost in targets.items()
+                    if witnessed.get(neighbor2, infinity) > cost
+                )
+            return shortcuts
+
+        def importance(node):
+            """edge difference (shortcuts added minus edges removed) plus the number of already contracted neighbors, which spreads the contraction evenly"""
+            return len(shortcuts_needed(node)) - len(adjacency[node]) + contracted_neighbors[node]
+
+        order = MutableMinHeap()
+        for node in adjacency:
+            order[node] = importance(node)
+
+        rank = {}
+        upward = {}
+        while order:
+            node = order.dequeue()
+            for neighbor1, neighbor2, cost in shortcuts_needed(node):
+                if cost < adjacency[neighbor1].get(neighbor2, (infinity, None))[0]:
+                    adjacency[neighbor1][neighbor2] = adjacency[neighbor2][neighbor1] = (cost, node)
+            rank[node] = len(rank)
+            upward[node] = adjacency.pop(node) #every neighbor still left will be contracted later, so all of these edges lead upwards
+            for neighbor in upward[node]:
+                del adjacency[neighbor][node]
+                contracted_neighbors[neighbor] += 1
+            for neighbor in upward[node]:
+                order[neighbor] = importance(neighbor) #only the neighborhood of the contracted node has changed
+        return cls(rank, upward)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            pickle.dump((self.rank, self.upward), file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls(*pickle.load(file))
+
+    def shortest_path_and_cost(self, source, destination):
+        """bidirectional Dijkstra over upward edges only; each side stops once its cheapest unsettled node costs at least the best route found so far. Returns the
+        path with all the shortcuts unpacked (a shortest path like dijkstra_shortest_path_and_cost would return, though ties may be broken differently) and its cost"""
+        heaps = (MutableMinHeap(), MutableMinHeap())
+        heaps[0][source] = heaps[1][destination] = 0
+        distances = ({source: 0}, {destination: 0})
+        previous = ({}, {})
+        best, meeting = infinity, None
+        active = [True, True]
+        side = 1
+
+        while active[0] or active[1]:
+            side = 1 - side if active[1 - side] else side #takes turns while both sides are still searching
+            if not heaps[side]:
+                active[side] = False
+                continue
+            node = heaps[side].dequeue()
+            distance = distances[side][node]
+            if distance >= best: #nothing cheaper can come from this side any more
+                active[side] = False
+                continue
+            if node in distances[1 - side] and distance + distances[1 - side][node] < best:
+                best, meeting = distance + distances[1 - side][node], node
+            for neighbor, (weight, _) in self.upward.get(node, {}).items():
+                if distance + weight < distances[side].get(neighbor, infinity):
+                    distances[side][neighbor] = heaps[side][neighbor] = distance + weight
+                    previous[side][neighbor] = node
+
+        if meeting is None:
+            return None, infinity
+        path = [meeting]
+        while path[-1] != source:
+            path.append(previous[0][path[-1]])
+        path.reverse()
+        while path[-1] != destination:
+            path.append(previous[1][path[-1]])
+        return self.unpack(path), best
+
+    def unpack(self, path):
+        """replaces every shortcut of the path with the two edges it stands for, repeatedly, until only original edges are left"""
+        unpacked = [path[0]]
+        stack = list(zip(path, path[1:]))[::-1] #edges still to unpack, the next one on top
+        while stack:
+            node1, node2 = stack.pop()
+            via = self.edge_via(node1, node2)
+            if via is None:
+                unpacked.append(node2)
+            else: #node1 -- via comes first, so it goes on top
+                stack.append((via, node2))
+                stack.append((node1, via))
+        return unpacked
+
+    def edge_via(self, node1, node2):
+        if node2 in self.upward.get(node1, {}):
+            return self.upward[node1][node2][1]
+        return self.upward[node2][node1][1]
+
+def witness_search(adjacency, source, excluded, targets):
+    """a small Dijkstra from source that avoids the node being contracted; it stops as soon as every target is settled, the costs exceed the most expensive target,
+    or WITNESS_SETTLE_LIMIT nodes have been settled. Returns the distances it found"""
+    limit = max(targets.values())
+    remaining = set(targets)
+    distances = {source: 0}
+    unvisited = MutableMinHeap()
+    unvisited[source] = 0
+    settled = 0
+    while unvisited and remaining and settled < WITNESS_SETTLE_LIMIT:
+        node = unvisited.dequeue()
+        distance = distances[node]
+        if distance > limit:
+            break
+        settled += 1
+        remaining.discard(node)
+        for neighbor, (weight, _) in adjacency[node].items():
+            if neighbor != excluded and distance + weight < distances.get(neighbor, infinity):
+                distances[neighbor] = unvisited[neighbor] = distance + weight
+    return distances
@@ -1,7 +1,6 @@
 
 from graph import (
-    City,
-    load_graph,
+    load_roadmap,
     depth_first_traverse,
     depth_first_search as dfs,
 )
@@ -9,7 +8,7 @@ from graph import (
 def is_twentieth_century(city):
     return city.year and 1901 <= city.year <= 2000
 
-nodes, graph = load_graph("roadmap.dot", City.from_dict)
+nodes, graph = load_roadmap()
 
 city = dfs(graph, nodes["edinburgh"], is_twentieth_century)
 print(city.name)
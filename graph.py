@@ -1,8 +1,16 @@
 from typing import NamedTuple
-from math import inf as infinity
-from queues import MutableMinHeap
+from math import inf as infinity, radians, sin, cos, asin, sqrt
+from queues import MutableMinHeap, DialHeap, RadixHeap
 import networkx as nx
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import os
+import pickle
+import re
+from array import array
+from functools import cache, partial
+from operator import itemgetter
 
 class IterableMixin: #inclusion of a mixin class rather than pure inheritance
     #mixins are great for encapsulating behavior rather than state
@@ -54,30 +62,501 @@ class City(NamedTuple): #extend a named tuple to ensure that your node objects a
             longitude=float(attrs["longitude"]),
         )
 
-def load_graph(filename, node_factory): #callable factory for the node objects like from the City.from_dict() class method
-    graph = nx.nx_agraph.read_dot(filename) #Reads a DOT file
+DOT_TOKEN = re.compile(
+    r'"((?:[^"\\]|\\.)*)"' #a quoted string
+    r'|(//|/\*|--|->|[{}\[\]=,;])' #a comment opener or a symbol
+    r'|((?:(?!--|->|//|/\*)[^\s{}\[\]=,;"])+)' #a bare word, which ends before an edge operator or a comment, so a--b is an edge
+    r'|(\S)' #anything else, e.g. a quote that is never closed
+)
+
+def tokenize_dot(lines):
+    """splits DOT source into tokens one line at a time, so the whole file never has to sit in memory; quoted strings come out without their quotes. Comments
+    (// and /* */ anywhere, # at the start of a line) are dropped, and a /* */ comment may span several lines"""
+    in_comment = False
+    for number, line in enumerate(lines, 1):
+        position = 0
+        if in_comment:
+            if (end := line.find("*/")) == -1:
+                continue
+            in_comment, position = False, end + 2
+        elif line.lstrip().startswith("#"): #preprocessor output lines
+            continue
+        while match := DOT_TOKEN.search(line, position):
+            quoted, symbol, word, other = match.groups()
+            position = match.end()
+            if symbol == "//":
+                break
+            if symbol == "/*":
+                if (end := line.find("*/", position)) == -1:
+                    in_comment = True
+                    break
+                position = end + 2
+            elif other:
+                raise ValueError(f"line {number}: unexpected {other!r} in DOT source")
+            elif symbol:
+                yield symbol
+            else:
+                yield "", word or quoted.replace('\\"', '"')
+    if in_comment:
+        raise ValueError("DOT source ends inside a /* comment")
+
+def parse_dot(lines):
+    """a small streaming parser for the subset of DOT used by roadmap.dot: graph/subgraph blocks, node and edge statements with [key=value] lists, and node/edge
+    default attributes which are inherited by everything declared after them inside the same block. It yields ("node", name, attributes) and
+    ("edge", name1, name2, attributes) tuples; attribute values are kept as strings, just like read_dot does. Constructs outside that subset which it can recognize,
+    like an edge to a whole subgraph (a -- { b c }), raise ValueError instead of quietly producing a different graph"""
+    tokens = tokenize_dot(lines)
+    scopes = [{"node": {}, "edge": {}}] #stack of default attributes, one entry per open block
+    lookahead = []
+    declared = set() #default attributes only apply to a node the first time it shows up
+
+    def next_token():
+        return lookahead.pop() if lookahead else next(tokens, None)
+
+    def next_word(expected):
+        """the next token, which has to be a name or a value; anything else is outside the supported subset"""
+        token = next_token()
+        if not isinstance(token, tuple):
+            raise ValueError(f"expected {expected} in DOT source, got {token!r}")
+        return token[1]
+
+    def read_attributes():
+        attributes = {}
+        while (token := next_token()) != "]":
+            if token in (",", ";"):
+                continue
+            if not isinstance(token, tuple):
+                raise ValueError(f"expected an attribute name in DOT source, got {token!r}")
+            key = token[1]
+            if (token := next_token()) == "=":
+                attributes[key] = next_word("an attribute value")
+            else: #an attribute without a value
+                attributes[key] = "true"
+                lookahead.append(token)
+        return attributes
+
+    while (token := next_token()) is not None:
+        if token in (";", ","):
+            continue
+        if token == "}":
+            if len(scopes) == 1:
+                raise ValueError("unbalanced } in DOT source")
+            scopes.pop()
+            continue
+        if token == "{": #an anonymous block
+            scopes.append({kind: dict(defaults) for kind, defaults in scopes[-1].items()})
+            continue
+        if not isinstance(token, tuple): #e.g. a stray [ or an edge operator without a node in front of it
+            raise ValueError(f"unexpected {token!r} in DOT source")
+        keyword = token[1]
+        if keyword in ("strict", "graph", "digraph", "subgraph", "node", "edge"):
+            following = next_token()
+            if following == "[": #default attributes for the current block
+                attributes = read_attributes()
+                if keyword in ("node", "edge"):
+                    scopes[-1][keyword].update(attributes)
+                continue
+            if keyword != "strict":
+                while following != "{": #skips the optional block name
+                    following = next_token()
+                scopes.append({kind: dict(defaults) for kind, defaults in scopes[-1].items()})
+            continue
+        names = [keyword]
+        following = next_token()
+        if following == "=": #a graph attribute like rankdir=LR
+            next_token()
+            continue
+        while following in ("--", "->"):
+            names.append(next_word("a node name (edges to subgraphs are not supported)"))
+            following = next_token()
+        attributes = read_attributes() if following == "[" else {}
+        if following not in ("[", None):
+            lookahead.append(following)
+        if len(names) == 1:
+            if names[0] in declared:
+                yield "node", names[0], attributes
+            else:
+                declared.add(names[0])
+                yield "node", names[0], {**scopes[-1]["node"], **attributes}
+        else:
+            for name in names: #nodes mentioned only in edges still exist
+                if name not in declared:
+                    declared.add(name)
+                    yield "node", name, dict(scopes[-1]["node"])
+            for name1, name2 in zip(names, names[1:]):
+                yield "edge", name1, name2, {**scopes[-1]["edge"], **attributes}
+
+def read_dot(filename):
+    """collects the output of parse_dot into node attributes and a list of edges; a node declared more than once keeps the attributes from all of its declarations.
+    The edges are listed node by node, the same way networkx lists them after read_dot, so that neighbors (and therefore every traversal) keep the same order"""
+    node_attributes = {}
+    declared_edges = []
+    with open(filename, encoding="utf-8") as file:
+        for statement in parse_dot(file):
+            if statement[0] == "node":
+                _, name, attributes = statement
+                node_attributes.setdefault(name, {}).update(attributes)
+            else:
+                declared_edges.append(statement[1:])
+    #Graphviz hands out the edges ordered by the position where their two nodes were declared, and networkx builds each list of neighbors in that order
+    positions = {name: position for position, name in enumerate(node_attributes)}
+    declared_edges.sort(key=lambda edge: (positions[edge[0]], positions[edge[1]])) #sort() is stable, so repeated edges keep their order from the file
+    adjacency = {name: {} for name in node_attributes}
+    for name1, name2, attributes in declared_edges:
+        adjacency[name1][name2] = adjacency[name2][name1] = attributes
+    seen = set()
+    edges = []
+    for name, neighbors in adjacency.items():
+        edges.extend((name, neighbor, attributes) for neighbor, attributes in neighbors.items() if neighbor not in seen)
+        seen.add(name)
+    return node_attributes, edges
+
+def read_edge_list(filename, nodes_filename=None):
+    """reads a CSV file (or TSV when the extension is .tsv) whose header starts with the two node names followed by any edge attributes, e.g. source,target,distance.
+    Node attributes can come from a second file with a name column followed by the attributes; without it every node only knows its own name"""
+    def rows(path):
+        with open(path, newline="", encoding="utf-8") as file:
+            yield from csv.reader(file, delimiter="\t" if path.endswith(".tsv") else ",")
+
+    records = rows(filename)
+    _, _, *keys = next(records) #header
+    edges = [(name1, name2, dict(zip(keys, values))) for name1, name2, *values in records]
+    if nodes_filename is None:
+        node_attributes = {name: {"name": name} for edge in edges for name in edge[:2]}
+    else:
+        records = rows(nodes_filename)
+        _, *keys = next(records)
+        node_attributes = {name: dict(zip(keys, values)) for name, *values in records}
+    return node_attributes, edges
+
+SNAPSHOT_VERSION = 1 #bump it whenever the layout written by write_snapshot changes
+
+def snapshot_key(*filenames):
+    """identifies the exact version of the source files by their modification time and size, which is much cheaper than hashing their content"""
+    return SNAPSHOT_VERSION, [
+        (os.path.abspath(filename), (status := os.stat(filename)).st_mtime_ns, status.st_size)
+        for filename in filenames if filename is not None
+    ]
+
+def write_snapshot(path, key, node_attributes, edges):
+    """saves the parsed graph with pickle; the edge endpoints become node positions packed into a single array instead of pairs of strings"""
+    names = list(node_attributes)
+    positions = {name: position for position, name in enumerate(names)}
+    endpoints = array("q")
+    edge_attributes = []
+    for name1, name2, attributes in edges:
+        endpoints.extend((positions[name1], positions[name2]))
+        edge_attributes.append(attributes)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        pickle.dump((key, names, list(node_attributes.values()), endpoints, edge_attributes), file, pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path) #readers never see a half-written snapshot
+
+def read_snapshot(path, key):
+    """returns the node attributes and edges stored by write_snapshot, or None when there is no snapshot or it was made from different source files"""
+    try:
+        with open(path, "rb") as file:
+            stored_key, names, attributes, endpoints, edge_attributes = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if stored_key != key:
+        return None
+    edges = [
+        (names[endpoints[2 * index]], names[endpoints[2 * index + 1]], weights)
+        for index, weights in enumerate(edge_attributes)
+    ]
+    return dict(zip(names, attributes)), edges
+
+def load_graph(filename, node_factory, nodes_filename=None, use_graphviz=False, snapshot=None, edge_types=None): #callable factory for the node objects like from the City.from_dict() class method
+    """.csv and .tsv files are read as edge lists, anything else as DOT with the native parser above, which needs neither Graphviz nor pygraphviz. use_graphviz=True 
+    switches back to networkx's read_dot for DOT files that use more of the language than roadmap.dot does. snapshot can be a path (or True for filename + ".snapshot") 
+    of a binary cache of the parsed file, which is reused as long as the source files haven't changed and rewritten otherwise. edge_types maps edge attribute names to 
+    the type they should be converted to, e.g. {"distance": float}, so the conversion from string happens once here instead of on every visit of the edge"""
+    if snapshot is True:
+        snapshot = filename + ".snapshot"
+    key = snapshot and snapshot_key(filename, nodes_filename)
+    if not (snapshot and (parsed := read_snapshot(snapshot, key))):
+        if use_graphviz:
+            graph = nx.nx_agraph.read_dot(filename) #Reads a DOT file
+            parsed = dict(graph.nodes(data=True)), list(graph.edges(data=True))
+        elif filename.endswith((".csv", ".tsv")):
+            parsed = read_edge_list(filename, nodes_filename)
+        else:
+            parsed = read_dot(filename)
+        if snapshot:
+            try:
+                write_snapshot(snapshot, key, *parsed)
+            except OSError: #e.g. a read-only directory; the snapshot only saves time, so loading carries on without it
+                pass
+    node_attributes, edges = parsed
+    if edge_types:
+        for _, _, weights in edges:
+            for name, convert in edge_types.items():
+                if name in weights:
+                    weights[name] = convert(weights[name])
     #build a mapping of node identifiers to the object-oriented representation of the graph nodes 
     nodes = {
         name: node_factory(attributes)
-        for name, attributes in graph.nodes(data=True)
+        for name, attributes in node_attributes.items()
     }
     #returns the mapping and a new graph comprising nodes and weighted edges
-    return nodes, nx.Graph(
+    graph = VersionedGraph(
         (nodes[name1], nodes[name2], weights)
-        for name1, name2, weights in graph.edges(data=True)
+        for name1, name2, weights in edges
+    )
+    graph.graph["components"] = ComponentIndex.from_graph(graph) #built once here so that connected() never has to search
+    return nodes, graph
+
+ROADMAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roadmap.dot") #found next to this file no matter where the program runs from
+
+@cache #the file is only parsed the first time, every later call returns the same nodes and graph
+def load_roadmap():
+    """the default roadmap of UK cities; nothing is read when graph.py gets imported, only when the roadmap is first needed, and later runs of any script that uses it
+    start from roadmap.dot.snapshot instead of parsing the DOT file again"""
+    return load_graph(ROADMAP, City.from_dict, snapshot=True)
+
+def __getattr__(name):
+    """keeps `from graph import nodes, graph` working by loading the roadmap on first access to either of them"""
+    if name == "nodes":
+        return load_roadmap()[0]
+    if name == "graph":
+        return load_roadmap()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class VersionedGraph(nx.Graph):
+    """an ordinary networkx Graph that counts its own changes: every method that adds or removes nodes or edges bumps version. Whatever is worked out from the shape 
+    of the graph, like the ComponentIndex below, remembers the version it was made for and is known to be out of date as soon as the two differ. New weights for an
+    existing edge bump it too when they go through set_weights(); writing them straight into the dictionary (graph[node1][node2]["distance"] = ...) goes unnoticed"""
+    version = 0
+
+    def add_node(self, *args, **kwargs):
+        self.version += 1
+        super().add_node(*args, **kwargs)
+
+    def add_nodes_from(self, *args, **kwargs):
+        self.version += 1
+        super().add_nodes_from(*args, **kwargs)
+
+    def remove_node(self, *args, **kwargs):
+        self.version += 1
+        super().remove_node(*args, **kwargs)
+
+    def remove_nodes_from(self, *args, **kwargs):
+        self.version += 1
+        super().remove_nodes_from(*args, **kwargs)
+
+    def add_edge(self, *args, **kwargs):
+        self.version += 1
+        super().add_edge(*args, **kwargs)
+
+    def add_edges_from(self, *args, **kwargs): #add_weighted_edges_from() and update() go through here too
+        self.version += 1
+        super().add_edges_from(*args, **kwargs)
+
+    def remove_edge(self, *args, **kwargs):
+        self.version += 1
+        super().remove_edge(*args, **kwargs)
+
+    def remove_edges_from(self, *args, **kwargs):
+        self.version += 1
+        super().remove_edges_from(*args, **kwargs)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+    def clear_edges(self):
+        self.version += 1
+        super().clear_edges()
+
+def graph_version(graph):
+    """the version of a VersionedGraph, or None when the changes of the graph can't be tracked: any other graph, or a frozen view (e.g. graph.subgraph()), which
+    changes together with the graph it shows without being told"""
+    if isinstance(graph, VersionedGraph) and not nx.is_frozen(graph):
+        return graph.version
+    return None
+
+class ComponentIndex:
+    """labels the connected components of an undirected graph with a union-find (disjoint set) structure: every node points towards a representative of its component,
+    so two nodes are connected exactly when they lead to the same representative. Thanks to path halving and union by size, both find() and add_edge() take nearly 
+    constant time, and adding edges later only merges components instead of relabelling the whole graph. Removing edges can split a component, which union-find 
+    cannot undo, so the index has to be rebuilt after that"""
+    def __init__(self):
+        self._parent = {}
+        self._size = {}
+        self.version = None #graph_version() of the graph the index was made for
+
+    @classmethod
+    def from_graph(cls, graph):
+        index = cls()
+        for node in graph.nodes:
+            index.add_node(node)
+        for node1, node2 in graph.edges:
+            index.add_edge(node1, node2)
+        index.version = graph_version(graph)
+        return index
+
+    def add_node(self, node):
+        if node not in self._parent:
+            self._parent[node] = node
+            self._size[node] = 1
+
+    def find(self, node):
+        parent = self._parent
+        if node not in parent: #a node without any edges is a component of its own
+            return node
+        while parent[node] != node:
+            parent[node] = parent[parent[node]] #path halving: skip a level on the way up so the next find is shorter
+            node = parent[node]
+        return node
+
+    def add_edge(self, node1, node2):
+        self.add_node(node1)
+        self.add_node(node2)
+        root1, root2 = self.find(node1), self.find(node2)
+        if root1 != root2:
+            if self._size[root1] < self._size[root2]: #the smaller tree goes under the bigger one to keep the trees shallow
+                root1, root2 = root2, root1
+            self._parent[root2] = root1
+            self._size[root1] += self._size[root2]
+
+    def connected(self, node1, node2):
+        return self.find(node1) == self.find(node2)
+
+def components_of(graph):
+    """returns the ComponentIndex stored in the graph by load_graph, building it again when it is missing or the graph has changed since. Only a VersionedGraph 
+    keeps its index; any other graph gets a new one every time, since there is no telling whether it was changed in between"""
+    version = graph_version(graph)
+    index = graph.graph.get("components")
+    if index is None or version is None or index.version != version:
+        index = ComponentIndex.from_graph(graph)
+        if version is not None:
+            graph.graph["components"] = index
+    return index
+
+def add_edge(graph, node1, node2, **weights):
+    """adds an edge to the graph and merges the two components in its index, so the index stays valid without being rebuilt"""
+    index = components_of(graph)
+    graph.add_edge(node1, node2, **weights)
+    index.add_edge(node1, node2)
+    index.version = graph_version(graph)
+
+def set_weights(graph, node1, node2, **weights):
+    """updates the attributes of an existing edge, e.g. set_weights(graph, york, leeds, distance=30.0), and bumps the version of a VersionedGraph so that whatever
+    depends on the weights (cached heap choices, RouteCache trees) is worked out again. The component index stays valid, since the shape hasn't changed"""
+    index = graph.graph.get("components")
+    current = index is not None and index.version is not None and index.version == graph_version(graph)
+    graph[node1][node2].update(weights)
+    if isinstance(graph, VersionedGraph):
+        graph.version += 1
+        if current:
+            index.version = graph.version
+
+def connected(graph, source, destination):
+    """constant-time reachability check, e.g. Belfast and Derry are on a different island than London"""
+    return components_of(graph).connected(source, destination)
+
+def known_disconnected(graph, source, destination):
+    """early rejection for the path functions; it only trusts an index that is already there and made for the current version of a VersionedGraph, it never 
+    builds one"""
+    index = getattr(graph, "graph", {}).get("components")
+    version = graph_version(graph)
+    return (
+        index is not None
+        and version is not None
+        and index.version == version
+        and not index.connected(source, destination)
     )
 
-nodes, graph = load_graph("roadmap.dot", City.from_dict) #called the function with value arguments then stored in variables
+def weight_getter(weight_factory):
+    """a weight strategy can also be the name of an edge attribute that was already converted by load_graph(edge_types=...), in which case the weight is read 
+    straight from the dictionary by itemgetter() without calling any Python function"""
+    if isinstance(weight_factory, str):
+        return itemgetter(weight_factory)
+    return weight_factory
+
+DIAL_MAX_WEIGHT = 1024 #above this, DialHeap would need too many buckets and RadixHeap is used instead
+
+def integer_heap(graph, weight_factory):
+    """picks the heap for Dijkstra: when every edge weight is a non-negative whole number, a DialHeap (small weights) or a RadixHeap (large ones), which never 
+    compare elements; otherwise the general MutableMinHeap. It scans every edge once, which the searches over the whole graph can afford on every call"""
+    weight = weight_getter(weight_factory)
+    max_weight = 0
+    for _, _, weights in graph.edges(data=True):
+        value = weight(weights)
+        if not (isinstance(value, (int, float)) and 0 <= value < infinity and value == int(value)):
+            return MutableMinHeap
+        max_weight = max(max_weight, int(value))
+    if graph.number_of_edges() == 0:
+        return MutableMinHeap
+    if max_weight <= DIAL_MAX_WEIGHT:
+        return partial(DialHeap, max_weight)
+    return RadixHeap
+
+def cached_integer_heap(graph, weight_factory):
+    """integer_heap() for the point-to-point searches, which would lose their early exit if they scanned every edge each time. The choice is remembered in the graph
+    per attribute name and version of a VersionedGraph; any other weight strategy or graph simply gets a MutableMinHeap. A weight written behind the graph's back can
+    still make the remembered heap unsuitable, but then it raises ValueError before handing out anything in the wrong order, and the search starts again without it"""
+    version = graph_version(graph)
+    if not isinstance(weight_factory, str) or version is None:
+        return MutableMinHeap
+    choices = graph.graph.setdefault("heap_choices", {})
+    if weight_factory not in choices or choices[weight_factory][0] != version:
+        choices[weight_factory] = version, integer_heap(graph, weight_factory)
+    return choices[weight_factory][1]
 
 def sort_by(neighbors, strategy):
     """helper function that returns a list of neighbors and their weights sorted by taking the dictionary of all the weights associated with an edge and 
     returns a sorting key."""
+    strategy = weight_getter(strategy)
     return sorted(neighbors.items(), key=lambda item: strategy(item[1])) #.items() used to return the list with all dictionary keys with values
 
 def by_distance(weights):
     """defined a concrete strategy that produces a floating-point distance based on the input dictionary"""
     return float(weights["distance"])
 
+EARTH_RADIUS_MILES = 3958.8 #the distances in roadmap.dot are given in miles
+
+def haversine_distance(city1, city2):
+    """great-circle ("as the crow flies") distance in miles between two cities using their latitude and longitude. A real road can't be shorter, but the distances of
+    a map can: roadmap.dot rounds them to whole miles and measures between city centres, so City of London - Westminster is 1 mile against 1.58 here. Used as it is, it
+    can overestimate the remaining cost, which is why A* uses the scaled down versions below"""
+    latitude1, latitude2 = radians(city1.latitude), radians(city2.latitude)
+    delta_latitude = latitude2 - latitude1
+    delta_longitude = radians(city2.longitude - city1.longitude)
+    h = sin(delta_latitude / 2) ** 2 + cos(latitude1) * cos(latitude2) * sin(delta_longitude / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * asin(sqrt(h))
+
+ROADMAP_HAVERSINE_FACTOR = 0.6 #the smallest road distance / haversine_distance ratio of any edge in roadmap.dot is 0.63 (City of London - Westminster)
+
+def roadmap_heuristic(city, destination):
+    """admissible A* heuristic for roadmap.dot: every road there is at least ROADMAP_HAVERSINE_FACTOR times the straight line between its two cities, so every
+    route is too, and the estimate never exceeds the real remaining distance"""
+    return ROADMAP_HAVERSINE_FACTOR * haversine_distance(city, destination)
+
+def haversine_heuristic(graph, weight_factory):
+    """the same kind of heuristic for any other graph of cities: the straight line scaled by the smallest weight / haversine_distance ratio over all the edges. It
+    scans every edge, so build it once per graph and reuse it for many searches (and build it again after changing the weights)"""
+    weight_factory = weight_getter(weight_factory)
+    factor = 1.0
+    for city1, city2, weights in graph.edges(data=True):
+        if (straight := haversine_distance(city1, city2)) > 0:
+            factor = min(factor, weight_factory(weights) / straight)
+    return lambda city, destination: factor * haversine_distance(city, destination)
+
+def default_heuristic(graph, source, weight_factory):
+    """what A* uses when no heuristic is given: haversine_heuristic() for a graph of cities (remembered per attribute name and version of a VersionedGraph, like
+    cached_integer_heap() does), or no estimate at all for any other kind of node, which is plain Dijkstra and never wrong"""
+    if not (hasattr(source, "latitude") and hasattr(source, "longitude")):
+        return lambda node, destination: 0
+    version = graph_version(graph)
+    if not isinstance(weight_factory, str) or version is None:
+        return haversine_heuristic(graph, weight_factory)
+    heuristics = graph.graph.setdefault("heuristics", {})
+    if weight_factory not in heuristics or heuristics[weight_factory][0] != version:
+        heuristics[weight_factory] = version, haversine_heuristic(graph, weight_factory)
+    return heuristics[weight_factory][1]
+
 """identify the immediate neighbors in the purpose of looking for the shortest path/finding available routes"""
 #for neighbor, weights in sort_by(graph[nodes["london"]], by_distance): 
 """an iteration over the neighbors of "London", sorted by distance in ascending order"""
@@ -89,6 +568,8 @@ def by_distance(weights):
 """this defined function takes another node as an argument and optionally lets you order the neighbors using a custom strategy"""
 def shortest_path(graph, source, destination, order_by=None):
     """Uses FIFO queue to keep track of the node neighbors"""
+    if known_disconnected(graph, source, destination): #no search can succeed, so none is started
+        return None
     queue = Queue(source)
     visited = {source}
     previous = {}
@@ -148,6 +629,42 @@ def breadth_first_traverse(graph, source, order_by=None):
 def breadth_first_search(graph, source, predicate, order_by=None):
     return search(breadth_first_traverse, graph, source, predicate, order_by)
 
+class BitSet:
+    """a visited set for graphs whose nodes are the integers 0 to size - 1 (like networkx.convert_node_labels_to_integers() makes): one bit per node, so marking millions 
+    of nodes costs size / 8 bytes instead of a hash table entry each"""
+    def __init__(self, size):
+        self._bits = bytearray((size + 7) // 8)
+
+    def add(self, node):
+        self._bits[node >> 3] |= 1 << (node & 7)
+
+    def __contains__(self, node):
+        return bool(self._bits[node >> 3] & (1 << (node & 7)))
+
+def breadth_first_layers(graph, source, max_depth=None, order_by=None, visited="set"):
+    """level-synchronous breadth-first traversal that yields (depth, frontier) pairs, where frontier lists every node exactly depth hops away from the source, e.g. 
+    "all cities within k hops" is the union of the layers up to max_depth=k. Only the current and the next frontier are kept in memory, and since it is a generator, 
+    the caller can stop after any layer. visited="bitmap" switches to a BitSet for graphs with integer nodes"""
+    visited = BitSet(graph.number_of_nodes()) if visited == "bitmap" else set()
+    visited.add(source)
+    frontier = [source]
+    depth = 0
+    while frontier:
+        yield depth, frontier
+        if depth == max_depth:
+            return
+        next_frontier = []
+        for node in frontier:
+            neighbors = list(graph.neighbors(node))
+            if order_by:
+                neighbors.sort(key=order_by)
+            for neighbor in neighbors:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+        depth += 1
+
 #won't initially mark the source node as visited
 def depth_first_traverse(graph, source, order_by=None):
     stack = Stack(source)
@@ -187,6 +704,37 @@ def recursive_depth_first_traverse(graph, source, order_by=None):
 
     return visit(source) #pops one when the corresponding function returns
 
+def depth_first_events(graph, source, order_by=None):
+    """the recursive traversal above rewritten with an explicit stack, so long chains of nodes neither hit the recursion limit nor pass every node up through a tower of 
+    nested generators. Each stack entry is a node together with the iterator over its remaining neighbors, which is exactly what a paused call of visit() remembers.
+    It yields ("pre", node) when a node is first visited and ("post", node) once all of its neighbors are done"""
+    visited = {source}
+    def neighbors_of(node):
+        neighbors = list(graph.neighbors(node))
+        if order_by:
+            neighbors.sort(key=order_by)
+        return iter(neighbors)
+
+    yield "pre", source
+    stack = [(source, neighbors_of(source))]
+    while stack:
+        node, neighbors = stack[-1]
+        for neighbor in neighbors: #resumes where this node left off
+            if neighbor not in visited:
+                visited.add(neighbor)
+                yield "pre", neighbor
+                stack.append((neighbor, neighbors_of(neighbor))) #the "recursive call"
+                break
+        else: #no unvisited neighbors left, so the "call" returns
+            stack.pop()
+            yield "post", node
+
+def iterative_depth_first_traverse(graph, source, order_by=None):
+    """visits the nodes in exactly the same order as recursive_depth_first_traverse, in linear time and without recursion"""
+    for event, node in depth_first_events(graph, source, order_by):
+        if event == "pre":
+            yield node
+
 def depth_first_search(graph, source, predicate, order_by=None):
     return search(depth_first_traverse, graph, source, predicate, order_by)
 
@@ -197,11 +745,15 @@ def search(traverse, graph, source, predicate, order_by=None):
         if predicate(node):
             return node
 
-def dijkstra_shortest_path(graph, source, destination, weight_factory):
+def dijkstra_shortest_path(graph, source, destination, weight_factory, heap=None):
+    if known_disconnected(graph, source, destination):
+        return None
+    heap = heap or integer_heap(graph, weight_factory) #every node gets seeded below anyway, so one more pass over the edges costs little; heap=MutableMinHeap opts out
+    weight_factory = weight_getter(weight_factory)
     previous = {}
     visited = set()
 
-    unvisited = MutableMinHeap()
+    unvisited = heap()
     """Initially, the distance to all destination cities is unknown, so an infinite cost should be assigned to each unvisited city except for the source, which has a distance 
     equal to zero"""
     for node in graph.nodes:
@@ -222,6 +774,535 @@ def dijkstra_shortest_path(graph, source, destination, weight_factory):
     
     return retrace(previous, source, destination)
 
+def dijkstra_shortest_path_and_cost(graph, source, destination, weight_factory, heap=None):
+    """point-to-point version of dijkstra_shortest_path: nodes only enter the priority queue once they are discovered, and the search stops as soon as the destination 
+    is popped, since its distance can no longer get any smaller. Returns the path together with its total cost, or (None, infinity) when there is no route"""
+    if known_disconnected(graph, source, destination):
+        return None, infinity
+    if heap is None and (heap := cached_integer_heap(graph, weight_factory)) is not MutableMinHeap:
+        try:
+            return dijkstra_shortest_path_and_cost(graph, source, destination, weight_factory, heap)
+        except ValueError: #a weight no longer suits the remembered heap
+            graph.graph["heap_choices"].pop(weight_factory, None)
+            heap = MutableMinHeap
+    weight_factory = weight_getter(weight_factory)
+    previous = {}
+    visited = set()
+    distances = {source: 0}
+
+    unvisited = heap()
+    unvisited[source] = 0 #instead of seeding every node with an infinite cost, only the source is known at the start
+
+    while unvisited:
+        visited.add(node := unvisited.dequeue())
+        if node == destination: #early exit, the rest of the graph is never touched
+            return retrace(previous, source, destination), distances[node]
+        for neighbor, weights in graph[node].items():
+            if neighbor not in visited:
+                new_distance = distances[node] + weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity): #an undiscovered neighbor counts as infinitely far away
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    previous[neighbor] = node
+
+    return None, infinity
+
+def a_star_shortest_path_and_cost(graph, source, destination, weight_factory, heuristic=None):
+    """A* works like dijkstra_shortest_path_and_cost but orders the priority queue by the known cost from the source plus an estimate of the remaining cost to the 
+    destination, so the search is pulled towards the destination instead of growing evenly in every direction. heuristic(node, destination) must never overestimate the 
+    real remaining cost, otherwise the returned path might not be the shortest one, because a node is never opened again once it has been visited. Without a heuristic
+    it builds a safe one from the graph itself (see default_heuristic), which costs a pass over the edges unless weight_factory names an attribute of a VersionedGraph;
+    roadmap_heuristic skips that for roadmap.dot, and heuristic=lambda node, destination: 0 turns it back into plain Dijkstra"""
+    if known_disconnected(graph, source, destination):
+        return None, infinity
+    if heuristic is None:
+        heuristic = default_heuristic(graph, source, weight_factory)
+    weight_factory = weight_getter(weight_factory)
+    previous = {}
+    visited = set()
+    distances = {source: 0}
+
+    unvisited = MutableMinHeap()
+    unvisited[source] = heuristic(source, destination)
+
+    while unvisited:
+        visited.add(node := unvisited.dequeue())
+        if node == destination:
+            return retrace(previous, source, destination), distances[node]
+        for neighbor, weights in graph[node].items():
+            if neighbor not in visited:
+                new_distance = distances[node] + weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity):
+                    distances[neighbor] = new_distance
+                    unvisited[neighbor] = new_distance + heuristic(neighbor, destination) #priority is the estimated total cost of a path going through the neighbor
+                    previous[neighbor] = node
+
+    return None, infinity
+
+def join_paths(forward_previous, backward_previous, source, destination, forward_node, backward_node):
+    """stitches together the two halves found by a bidirectional search, where forward_node was reached from the source and backward_node (its neighbor) from the 
+    destination. Each half is rebuilt with retrace, and the backward one is reversed so that the whole path reads from the source to the destination"""
+    forward_path = retrace(forward_previous, source, forward_node)
+    backward_path = retrace(backward_previous, destination, backward_node)
+    if forward_node == backward_node:
+        backward_path.pop() #the meeting node would otherwise appear twice
+    return forward_path + backward_path[::-1]
+
+def bidirectional_shortest_path(graph, source, destination, order_by=None):
+    """breadth-first version of shortest_path that grows one FIFO queue from the source and another one from the destination, always expanding a whole level of the 
+    smaller frontier, until the two searches meet somewhere in the middle. Only works for undirected graphs, such as the ones made by load_graph, because the backward 
+    search walks the same edges as the forward one"""
+    if known_disconnected(graph, source, destination):
+        return None
+    if source == destination:
+        return [source]
+    queues = (Queue(source), Queue(destination))
+    depths = ({source: 0}, {destination: 0})
+    previous = ({}, {})
+
+    while queues[0] and queues[1]:
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1 #the smaller frontier is cheaper to expand
+        queue, depth, other_depth = queues[side], depths[side], depths[1 - side]
+        best, meeting = infinity, None
+        for _ in range(len(queue)): #one whole level, so that every meeting point of this level gets compared
+            node = queue.dequeue()
+            neighbors = list(graph.neighbors(node))
+            if order_by:
+                neighbors.sort(key=order_by)
+            for neighbor in neighbors:
+                if neighbor not in depth:
+                    depth[neighbor] = depth[node] + 1
+                    previous[side][neighbor] = node
+                    queue.enqueue(neighbor)
+                if neighbor in other_depth and depth[node] + 1 + other_depth[neighbor] < best:
+                    best = depth[node] + 1 + other_depth[neighbor]
+                    meeting = (node, neighbor) if side == 0 else (neighbor, node)
+        if meeting:
+            return join_paths(previous[0], previous[1], source, destination, *meeting)
+
+def bidirectional_dijkstra_shortest_path_and_cost(graph, source, destination, weight_factory):
+    """runs dijkstra_shortest_path_and_cost from both ends at once, taking turns between the two MutableMinHeap frontiers. Every edge that links the two searches is a 
+    candidate route, and the search can stop once the costs of the last nodes popped from each side add up to no less than the best candidate found so far, since no 
+    cheaper route can be left. Like bidirectional_shortest_path, it expects an undirected graph"""
+    if known_disconnected(graph, source, destination):
+        return None, infinity
+    weight_factory = weight_getter(weight_factory)
+    if source == destination:
+        return [source], 0
+    heaps = (MutableMinHeap(), MutableMinHeap())
+    heaps[0][source] = heaps[1][destination] = 0
+    distances = ({source: 0}, {destination: 0})
+    previous = ({}, {})
+    visited = (set(), set())
+    last_popped = [0, 0] #cost of the latest node settled on each side
+    best, meeting = infinity, None
+    side = 1
+
+    while heaps[0] and heaps[1]:
+        side = 1 - side #alternates between the forward and the backward search
+        node = heaps[side].dequeue()
+        last_popped[side] = distances[side][node]
+        if last_popped[0] + last_popped[1] >= best:
+            break
+        visited[side].add(node)
+        for neighbor, weights in graph[node].items():
+            if neighbor in visited[side]:
+                continue
+            new_distance = distances[side][node] + weight_factory(weights)
+            if new_distance < distances[side].get(neighbor, infinity):
+                distances[side][neighbor] = heaps[side][neighbor] = new_distance
+                previous[side][neighbor] = node
+            if neighbor in distances[1 - side] and new_distance + distances[1 - side][neighbor] < best:
+                best = new_distance + distances[1 - side][neighbor]
+                meeting = (node, neighbor) if side == 0 else (neighbor, node)
+
+    if meeting is None:
+        return None, infinity
+    return join_paths(previous[0], previous[1], source, destination, *meeting), best
+
+def dijkstra_single_source(graph, source, weight_factory, heap=None):
+    """one-to-many Dijkstra: a single run settles every node reachable from the source and returns two dictionaries, the total cost of reaching each node and the 
+    previous node on its shortest path. retrace(previous, source, destination) then rebuilds the path to any destination without searching again"""
+    heap = heap or integer_heap(graph, weight_factory) #it settles every reachable node, so scanning the edges first costs little
+    weight_factory = weight_getter(weight_factory)
+    previous = {}
+    visited = set()
+    distances = {source: 0}
+
+    unvisited = heap()
+    unvisited[source] = 0
+
+    while unvisited:
+        visited.add(node := unvisited.dequeue())
+        for neighbor, weights in graph[node].items():
+            if neighbor not in visited:
+                new_distance = distances[node] + weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity):
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    previous[neighbor] = node
+
+    return distances, previous
+
+worker_graph = worker_weight_factory = None #set once in every worker process by init_matrix_worker, so the graph isn't sent again with each source
+
+def init_matrix_worker(graph, weight_factory):
+    global worker_graph, worker_weight_factory
+    worker_graph, worker_weight_factory = graph, weight_factory
+
+def distance_row(graph, weight_factory, source, destinations, with_previous):
+    """one single-source search and the distances to the requested destinations"""
+    distances, previous = dijkstra_single_source(graph, source, weight_factory)
+    return [distances.get(destination, infinity) for destination in destinations], (previous if with_previous else None)
+
+def matrix_row(source, destinations, with_previous):
+    """runs in a worker process, on the graph that init_matrix_worker left there"""
+    return distance_row(worker_graph, worker_weight_factory, source, destinations, with_previous)
+
+def distance_matrix(graph, sources, destinations, weight_factory, max_workers=None, with_previous=False):
+    """many-to-many distances: row i holds the costs from sources[i] to every node in destinations (infinity when it can't be reached). Each source is one 
+    dijkstra_single_source run, and the runs are spread over a pool of processes. Because the graph and weight_factory travel to other processes, weight_factory 
+    has to be picklable, i.e. a module-level function like by_distance or an attribute name, not a lambda. with_previous=True also returns the previous dictionary 
+    of every source, ready for retrace"""
+    sources, destinations = list(sources), list(destinations)
+    if max_workers == 1 or len(sources) < 2: #a pool isn't worth starting for a single search, and the worker globals stay untouched in this process
+        rows = [distance_row(graph, weight_factory, source, destinations, with_previous) for source in sources]
+    else:
+        with ProcessPoolExecutor(max_workers, initializer=init_matrix_worker, initargs=(graph, weight_factory)) as executor:
+            rows = list(executor.map(
+                matrix_row, sources, [destinations] * len(sources), [with_previous] * len(sources),
+                chunksize=max(1, len(sources) // (4 * (max_workers or os.cpu_count() or 1))),
+            ))
+    matrix = [row for row, _ in rows]
+    if with_previous:
+        return matrix, [previous for _, previous in rows]
+    return matrix
+
+def breadth_first_previous(graph, source, order_by=None):
+    """the whole breadth-first tree of the source: shortest_path without the early return, so retrace() can answer a query to any destination later on"""
+    queue = Queue(source)
+    previous = {}
+    visited = {source}
+    while queue:
+        node = queue.dequeue()
+        neighbors = list(graph.neighbors(node))
+        if order_by:
+            neighbors.sort(key=order_by)
+        for neighbor in neighbors:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                queue.enqueue(neighbor)
+                previous[neighbor] = node
+    return previous
+
+class RouteCache:
+    """memoizes complete previous dictionaries (shortest-path trees) per source, so every later query starting from a cached source is answered by retrace() alone.
+    Only the maxsize most recently used trees are kept. On a VersionedGraph (what load_graph returns) the cache notices nodes or edges being added or removed and
+    weights changed through set_weights(); a weight written straight into the edge's dictionary, or any change to another kind of graph, must be followed by
+    invalidate()"""
+    def __init__(self, graph, maxsize=128):
+        self.graph = graph
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._trees = OrderedDict() #remembers the order of use, oldest first
+        self._version = graph_version(graph)
+
+    def invalidate(self):
+        self._trees.clear()
+        self._version = graph_version(self.graph)
+
+    def _tree(self, key, build):
+        if graph_version(self.graph) != self._version:
+            self.invalidate()
+        if key in self._trees:
+            self.hits += 1
+            self._trees.move_to_end(key)
+            return self._trees[key]
+        self.misses += 1
+        tree = self._trees[key] = build()
+        if len(self._trees) > self.maxsize:
+            self._trees.popitem(last=False) #evicts the least recently used tree
+        return tree
+
+    def shortest_path(self, source, destination, order_by=None):
+        """same as shortest_path(graph, source, destination, order_by)"""
+        previous = self._tree(("bfs", source, order_by), lambda: breadth_first_previous(self.graph, source, order_by))
+        return retrace(previous, source, destination)
+
+    def dijkstra_shortest_path(self, source, destination, weight_factory):
+        """a cheapest path like dijkstra_shortest_path(graph, source, destination, weight_factory); when several paths cost the same, either one may come back"""
+        _, previous = self._tree(("dijkstra", source, weight_factory), lambda: dijkstra_single_source(self.graph, source, weight_factory))
+        return retrace(previous, source, destination)
+
+class ShortestPathTree:
+    """the distances and previous dictionaries of one source, plus the reverse links (children) so that the part of the tree hanging below a node can be found 
+    without scanning the whole previous dictionary"""
+    def __init__(self, source, distances, previous):
+        self.source = source
+        self.distances = distances
+        self.previous = previous
+        self.children = {}
+        for node, parent in previous.items():
+            self.children.setdefault(parent, set()).add(node)
+
+    def set_previous(self, node, parent):
+        self.forget_parent(node)
+        self.previous[node] = parent
+        self.children.setdefault(parent, set()).add(node)
+
+    def forget_parent(self, node):
+        if (parent := self.previous.pop(node, None)) is not None:
+            self.children[parent].discard(node)
+
+    def subtree(self, root):
+        """every node whose shortest path goes through root, root included"""
+        nodes = []
+        stack = Stack(root)
+        while stack:
+            nodes.append(node := stack.dequeue())
+            for child in self.children.get(node, ()):
+                stack.enqueue(child)
+        return nodes
+
+class DynamicRoutes:
+    """keeps single-source shortest-path trees up to date while roads open, close or change length during the day. set_edge() and remove_edge() change the graph 
+    and then repair every cached tree instead of recomputing it: a cheaper edge spreads its savings outwards from the endpoint it improves, like Dijkstra started 
+    from there, while a more expensive or removed edge only matters when the tree used it, and then only the subtree below it is searched again"""
+    def __init__(self, graph, weight_factory):
+        self.graph = graph
+        self.weight_factory = weight_getter(weight_factory)
+        self.trees = {}
+
+    def tree(self, source):
+        if source not in self.trees:
+            distances, previous = dijkstra_single_source(self.graph, source, self.weight_factory)
+            self.trees[source] = ShortestPathTree(source, distances, previous)
+        return self.trees[source]
+
+    def shortest_path_and_cost(self, source, destination):
+        tree = self.tree(source)
+        return retrace(tree.previous, source, destination), tree.distances.get(destination, infinity)
+
+    def set_edge(self, node1, node2, **weights):
+        """adds the edge or updates its attributes, e.g. set_edge(york, leeds, distance=30.0)"""
+        if self.graph.has_edge(node1, node2):
+            old_weight = self.weight_factory(self.graph[node1][node2])
+            set_weights(self.graph, node1, node2, **weights)
+        else:
+            old_weight = infinity
+            add_edge(self.graph, node1, node2, **weights)
+        new_weight = self.weight_factory(self.graph[node1][node2])
+        for tree in self.trees.values():
+            if new_weight < old_weight:
+                self._repair_decrease(tree, node1, node2, new_weight)
+            elif new_weight > old_weight:
+                self._repair_increase(tree, node1, node2)
+
+    def remove_edge(self, node1, node2):
+        self.graph.remove_edge(node1, node2) #bumps the version of a VersionedGraph, so the component index gets rebuilt when it is next needed
+        for tree in self.trees.values():
+            self._repair_increase(tree, node1, node2)
+
+    def _repair_decrease(self, tree, node1, node2, weight):
+        distances = tree.distances
+        unvisited = MutableMinHeap()
+        for start, end in ((node1, node2), (node2, node1)):
+            if start in distances and distances[start] + weight < distances.get(end, infinity):
+                distances[end] = unvisited[end] = distances[start] + weight
+                tree.set_previous(end, start)
+        self._propagate(tree, unvisited)
+
+    def _repair_increase(self, tree, node1, node2):
+        if tree.previous.get(node2) == node1:
+            child = node2
+        elif tree.previous.get(node1) == node2:
+            child = node1
+        else: #the tree didn't use this edge, so no distance can change
+            return
+        affected = tree.subtree(child)
+        for node in affected:
+            tree.forget_parent(node)
+            del tree.distances[node]
+        unvisited = MutableMinHeap()
+        for node in affected: #the best way back into the rest of the tree for each affected node
+            for neighbor, weights in self.graph[node].items():
+                if neighbor in tree.distances:
+                    new_distance = tree.distances[neighbor] + self.weight_factory(weights)
+                    if new_distance < tree.distances.get(node, infinity):
+                        tree.distances[node] = unvisited[node] = new_distance
+                        tree.set_previous(node, neighbor)
+        self._propagate(tree, unvisited)
+
+    def _propagate(self, tree, unvisited):
+        """the main loop of Dijkstra's algorithm, only running for as long as some distance keeps getting smaller"""
+        distances = tree.distances
+        while unvisited:
+            node = unvisited.dequeue()
+            for neighbor, weights in self.graph[node].items():
+                new_distance = distances[node] + self.weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity):
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    tree.set_previous(neighbor, node)
+
+def dijkstra_avoiding(graph, source, destination, weight_factory, removed_nodes, removed_edges):
+    """dijkstra_shortest_path_and_cost on what is left of the graph after taking away some nodes and some (node1, node2) edges, without copying the graph"""
+    previous = {}
+    visited = set(removed_nodes)
+    distances = {source: 0}
+    unvisited = MutableMinHeap()
+    unvisited[source] = 0
+    while unvisited:
+        visited.add(node := unvisited.dequeue())
+        if node == destination:
+            return retrace(previous, source, destination), distances[node]
+        for neighbor, weights in graph[node].items():
+            if neighbor not in visited and (node, neighbor) not in removed_edges:
+                new_distance = distances[node] + weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity):
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    previous[neighbor] = node
+    return None, infinity
+
+def k_shortest_paths(graph, source, destination, weight_factory):
+    """Yen's algorithm: yields (path, cost) pairs of loopless paths, cheapest first, computing each alternative only when the caller asks for it, e.g. 
+    itertools.islice(k_shortest_paths(...), 3) for the best three routes. Every next path leaves one of the accepted paths at some spur node, so for each node of the 
+    last accepted path it searches from there while avoiding the edges the accepted paths already took and the nodes before the spur node. The candidates wait in a 
+    MutableMinHeap keyed by the path itself"""
+    path, cost = dijkstra_shortest_path_and_cost(graph, source, destination, weight_factory) #the caller's own strategy, the converted one is only used below
+    weight = weight_getter(weight_factory)
+    if path is None:
+        return
+    accepted = [path]
+    yield path, cost
+    candidates = MutableMinHeap()
+    seen = {tuple(path)} #every path that was ever a candidate, so that none is offered twice
+    while True:
+        last = accepted[-1]
+        root_cost = 0
+        for index, spur in enumerate(last[:-1]):
+            root = last[:index + 1]
+            removed_edges = set()
+            for path in accepted:
+                if path[:index + 1] == root: #paths sharing this root must not be found again
+                    removed_edges.update({(path[index], path[index + 1]), (path[index + 1], path[index])})
+            spur_path, spur_cost = dijkstra_avoiding(graph, spur, destination, weight, root[:-1], removed_edges)
+            if spur_path is not None:
+                candidate = tuple(root[:-1] + spur_path)
+                if candidate not in seen:
+                    seen.add(candidate)
+                    candidates[candidate] = root_cost + spur_cost
+            root_cost += weight(graph[spur][last[index + 1]])
+        if not candidates:
+            return
+        path = candidates.dequeue()
+        accepted.append(list(path))
+        yield list(path), candidates[path]
+
+def all_shortest_paths(graph, source, destination, weight_factory=None):
+    """yields every shortest path between two nodes (they all cost the same), like nx.all_shortest_paths. Without weight_factory it counts hops with a breadth-first 
+    search on a Queue, otherwise it runs Dijkstra on a MutableMinHeap; either way every node remembers all the neighbors that reach it at the best cost. The paths 
+    are then walked backwards from the destination with a Stack, one at a time, so asking for only the first few is cheap even when there are thousands of them"""
+    predecessors = {source: []}
+    distances = {source: 0}
+    if weight_factory is None:
+        queue = Queue(source)
+        while queue:
+            node = queue.dequeue()
+            if destination in distances and distances[node] >= distances[destination]:
+                break #the rest of the queue is too far away to be on a shortest path
+            for neighbor in graph.neighbors(node):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    predecessors[neighbor] = [node]
+                    queue.enqueue(neighbor)
+                elif distances[neighbor] == distances[node] + 1:
+                    predecessors[neighbor].append(node)
+    else:
+        weight_factory = weight_getter(weight_factory)
+        visited = set()
+        unvisited = MutableMinHeap()
+        unvisited[source] = 0
+        while unvisited:
+            node = unvisited.dequeue()
+            if distances[node] > distances.get(destination, infinity):
+                break
+            visited.add(node)
+            for neighbor, weights in graph[node].items():
+                if neighbor in visited:
+                    continue
+                new_distance = distances[node] + weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity):
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    predecessors[neighbor] = [node]
+                elif new_distance == distances[neighbor]: #another, equally cheap way in
+                    predecessors[neighbor].append(node)
+    if destination not in distances:
+        return
+    stack = Stack([destination]) #partial paths, written from the destination backwards
+    while stack:
+        path = stack.dequeue()
+        if path[-1] == source:
+            yield path[::-1]
+            continue
+        for predecessor in reversed(predecessors[path[-1]]): #reversed so that the first predecessor is expanded first
+            stack.enqueue(path + [predecessor])
+
+def multi_source_shortest_paths(graph, sources, targets=None, order_by=None):
+    """breadth-first search that starts from all the sources at once, as if they were a single node at depth zero, e.g. "which depot is the fewest hops away from 
+    each city" in one traversal instead of one per depot. Returns three dictionaries: the nearest source of every reached node, its number of hops from that 
+    source and its previous node, so retrace(previous, nearest[node], node) gives the path. With targets, it stops as soon as all of them have been reached"""
+    sources = list(sources)
+    nearest = {source: source for source in sources}
+    distances = dict.fromkeys(sources, 0)
+    previous = {}
+    remaining = set(targets) - nearest.keys() if targets is not None else None
+    queue = Queue(*nearest)
+    while queue and remaining != set():
+        node = queue.dequeue()
+        neighbors = list(graph.neighbors(node))
+        if order_by:
+            neighbors.sort(key=order_by)
+        for neighbor in neighbors:
+            if neighbor not in distances:
+                distances[neighbor] = distances[node] + 1
+                nearest[neighbor] = nearest[node] #inherits the source of the node that discovered it
+                previous[neighbor] = node
+                queue.enqueue(neighbor)
+                if remaining is not None:
+                    remaining.discard(neighbor)
+    return nearest, distances, previous
+
+def multi_source_dijkstra(graph, sources, weight_factory, targets=None):
+    """Dijkstra's algorithm seeded with every source at cost zero, returning the same three dictionaries as multi_source_shortest_paths but for the cheapest source. 
+    With targets, the search stops once every target has been settled (popped from the heap), which also makes it a many-target search when given a single source"""
+    weight_factory = weight_getter(weight_factory)
+    sources = list(sources)
+    nearest = {source: source for source in sources}
+    distances = dict.fromkeys(sources, 0)
+    previous = {}
+    visited = set()
+    remaining = set(targets) if targets is not None else None
+
+    unvisited = MutableMinHeap()
+    for source in nearest:
+        unvisited[source] = 0
+
+    while unvisited and remaining != set():
+        visited.add(node := unvisited.dequeue())
+        if remaining is not None:
+            remaining.discard(node)
+        for neighbor, weights in graph[node].items():
+            if neighbor not in visited:
+                new_distance = distances[node] + weight_factory(weights)
+                if new_distance < distances.get(neighbor, infinity):
+                    distances[neighbor] = unvisited[neighbor] = new_distance
+                    nearest[neighbor] = nearest[node]
+                    previous[neighbor] = node
+
+    if remaining is not None: #nodes still in the heap only have tentative costs, so only settled ones are reported
+        nearest = {node: source for node, source in nearest.items() if node in visited}
+        distances = {node: distance for node, distance in distances.items() if node in visited}
+        previous = {node: parent for node, parent in previous.items() if node in visited} #a settled node's parent was settled before it, so paths stay complete
+    return nearest, distances, previous
+
 #for city in depth_first_traverse(graph, nodes["edinburgh"]):
 #    print(city.name)
-
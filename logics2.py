@@ -2,6 +2,7 @@ import networkx as nx
 from typing import NamedTuple
 from collections import deque
 from queues import Queue
+from graph import ROADMAP, components_of, load_graph #load_graph returns a VersionedGraph with the component index already built
 
 
 
@@ -24,19 +25,6 @@ class City(NamedTuple): #extend a named tuple to ensure that your node objects a
             longitude=float(attrs["longitude"]),
         )
 
-def load_graph(filename, node_factory): #callable factory for the node objects like from the City.from_dict() class method
-    graph = nx.nx_agraph.read_dot(filename) #Reads a DOT file
-    #build a mapping of node identifiers to the object-oriented representation of the graph nodes 
-    nodes = {
-        name: node_factory(attributes)
-        for name, attributes in graph.nodes(data=True)
-    }
-    #returns the mapping and a new graph comprising nodes and weighted edges
-    return nodes, nx.Graph(
-        (nodes[name1], nodes[name2], weights)
-        for name1, name2, weights in graph.edges(data=True)
-    )
-
 def shortest_path(graph, source, destination, order_by=None):
     """Uses FIFO queue to keep track of the node neighbors"""
     queue = Queue(source)
@@ -80,10 +68,11 @@ def by_latitude(city):
     return -city.latitude #to enforce a descending order, the minus sign (-) is added in front of the .latitude attribute
 
 def connected(graph, source, destination):
-    """this will tell if certain cities may be connected or not: case in point, islands"""
-    return shortest_path(graph, source, destination) is not None
+    """this will tell if certain cities may be connected or not: case in point, islands. Instead of a whole breadth-first search, it looks up the component 
+    index from graph.py, which answers in constant time once it is built"""
+    return components_of(graph).connected(source, destination)
 
-nodes, graph = load_graph("roadmap.dot", City.from_dict) #called the function with value arguments then stored in variables
+nodes, graph = load_graph(ROADMAP, City.from_dict, snapshot=True) #reuses roadmap.dot.snapshot, shared with load_roadmap(), when the DOT file has not changed; called the function with value arguments then stored in variables
 
 city1 = nodes["aberdeen"]
 city2 = nodes["perth"]
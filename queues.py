@@ -1,10 +1,11 @@
 from collections import deque
+from queue import Full #the exception a full bounded queue raises
 from typing import Any
 #counts from zero to infinity concisely
 from itertools import count
 #lexicographic order - the alphabetical order of the dictionaries to sequences of ordered symbols or, more generally, of elements of a totally ordered set
-from dataclasses import dataclass 
-from heapq import heapify, heappush, heappop
+from dataclasses import dataclass, field
+from heapq import heappush, heappop
 #heap compares elements by value not by priority so Python’s tuple can be used for comparison which takes into account the tuple’s components
 """This current program actually just has a problem with numerical value and turns out there are a lot of ways to fix this"""
 #variables with value as argument for priority parameter
@@ -15,6 +16,8 @@ NEUTRAL = 1
 class IterableMixin: #inclusion of a mixin class rather than pure inheritance
     #mixins are great for encapsulating behavior rather than state
     #by composing a class with one or more mixins, you can change or augment its original behavior.
+    __slots__ = () #lets subclasses that declare __slots__ skip the per-instance __dict__
+
     def __len__(self): # this reports the stack's number of elements
         """defining __len__ will make len() work since it calls upon __len__"""
         return len(self._elements)
@@ -27,6 +30,9 @@ class IterableMixin: #inclusion of a mixin class rather than pure inheritance
 class Queue(IterableMixin): #object constructor
     """this class is a simple structure of a FIFO queue wherein you add another element to the last index then gets the first element from the left side 
     or the one with zero index"""
+    __slots__ = ("_elements",) #fixed attributes instead of a dictionary, so every instance is smaller
+    _take = staticmethod(deque.popleft) #the end of the deque that dequeue_many() and iteration take elements from
+
     def __init__(self, *elements):
         """here inputting initial elements is allowed"""
         self._elements = deque(elements)
@@ -36,14 +42,63 @@ class Queue(IterableMixin): #object constructor
 
     def dequeue(self):
         return self._elements.popleft()
+
+    def enqueue_many(self, elements):
+        """adds a whole batch with one call; deque.extend() loops in C instead of calling enqueue() for every element"""
+        self._elements.extend(elements)
+
+    def dequeue_many(self, n):
+        """removes and returns up to n elements in dequeue order (fewer when the queue runs out)"""
+        elements, take = self._elements, self._take
+        return [take(elements) for _ in range(min(n, len(elements)))]
+
+    def __iter__(self):
+        """same as the mixin's version but pops straight from the deque, without calling len() and dequeue() for every element"""
+        elements, take = self._elements, self._take
+        while elements:
+            yield take(elements)
         
 class Stack(Queue):
     """this program is a simple structure of a LIFO queue wherein you add naother element to the last index then gets the last element you add first"""
+    __slots__ = ()
+    _take = staticmethod(deque.pop)
+
     def dequeue(self):
         # this was for the FIFO -- return self._elements.popleft() #gets the first element from the left since this is portrayed in a horizontal manner but still preserves 
         # the general idea of a stack
         return self._elements.pop() #gets the last element
 
+class BoundedQueue(Queue):
+    """a ring buffer with a fixed capacity, built on deque(maxlen=...), which reuses its slots instead of growing. When it is full, overwrite=True lets a new 
+    element push out the oldest one, while overwrite=False rejects it with queue.Full like the thread-safe queues do"""
+    __slots__ = ("overwrite",)
+
+    def __init__(self, capacity, *elements, overwrite=True):
+        self._elements = deque(maxlen=capacity)
+        self.overwrite = overwrite
+        self.enqueue_many(elements)
+
+    @property
+    def capacity(self):
+        return self._elements.maxlen
+
+    def enqueue(self, element):
+        if not self.overwrite and len(self._elements) == self._elements.maxlen:
+            raise Full
+        self._elements.append(element) #a full deque with maxlen drops the element at the opposite end by itself
+
+    def enqueue_many(self, elements):
+        """with overwrite=False the batch is accepted or rejected as a whole"""
+        if not self.overwrite:
+            elements = list(elements)
+            if len(self._elements) + len(elements) > self._elements.maxlen:
+                raise Full
+        self._elements.extend(elements)
+
+class BoundedStack(Stack, BoundedQueue):
+    """the LIFO version of BoundedQueue; when overwriting, the element at the bottom of the stack (the oldest) is the one that gets dropped"""
+    __slots__ = ()
+
 class PriorityQueue(IterableMixin):
     def __init__(self): #__init__ is automatically used when creating a class
         self._elements = [] #self parameter used to access variables of the class; the underscore on the elements means internal bit of implementation which means it cannot be accessed outside the class/modify
@@ -65,6 +120,40 @@ class PriorityQueue(IterableMixin):
 
 
 
+class BucketPriorityQueue(IterableMixin):
+    """same enqueue_with_priority()/dequeue() as PriorityQueue, for when the priorities are a few small integers like CRITICAL, IMPORTANT and NEUTRAL. Every 
+    priority level gets its own FIFO deque (a bucket), and one integer works as a bitmap with bit p set while bucket p has elements, so the highest non-empty level 
+    is just bitmap.bit_length() - 1. Both operations take constant time, don't build tuples, and keep the FIFO order within a level"""
+    __slots__ = ("_buckets", "_bitmap", "_size")
+
+    def __init__(self, max_priority=CRITICAL):
+        self._buckets = [deque() for _ in range(max_priority + 1)] #priorities from 0 up to max_priority
+        self._bitmap = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def enqueue_with_priority(self, priority, value):
+        if not 0 <= priority < len(self._buckets): #checked first, a negative index would quietly pick the highest bucket
+            raise ValueError(f"priority must be between 0 and {len(self._buckets) - 1}, got {priority!r}")
+        self._buckets[priority].append(value)
+        self._bitmap |= 1 << priority
+        self._size += 1
+
+    def dequeue(self):
+        if not self._bitmap:
+            raise IndexError("dequeue from an empty priority queue")
+        priority = self._bitmap.bit_length() - 1 #the highest bit that is set
+        bucket = self._buckets[priority]
+        value = bucket.popleft()
+        if not bucket:
+            self._bitmap &= ~(1 << priority)
+        self._size -= 1
+        return value
+
+
+
 #Dijkstra’s algorithm
 """this specialized priority queue stores data class elements instead of tuples because the elements must be mutable. Notice the additional order flag, which makes the elements
  comparable, just like tuples. This is a mutable version of min-heap (behaves mostly the same as the regular priority queue) to enqueue unvisited nodes and update the element 
@@ -74,6 +163,8 @@ class Element:
     priority: float
     count: int
     value: Any
+    #position of the element inside the heap list so that it can be found without scanning; -1 means it was already dequeued
+    index: int = field(default=-1, compare=False)
 
 class MutableMinHeap(IterableMixin):
     def __init__(self):
@@ -87,18 +178,184 @@ class MutableMinHeap(IterableMixin):
     Sometimes, a path consisting of more nodes will have a smaller total cost."""
     def __setitem__(self, unique_value, priority):
         if unique_value in self._elements_by_value:
-            self._elements_by_value[unique_value].priority = priority
-            heapify(self._elements) #heapify is the process of creating a heap data structure from a binary tree. it is used to create a Min-Heap or a Max-Heap
+            element = self._elements_by_value[unique_value]
+            element.priority = priority
+            if element.index >= 0: #only elements still inside the heap need to be moved
+                #instead of heapify() over the whole list (O(n)), the updated element is moved up or down from its own slot (O(log n))
+                self._sift_up(element.index)
+                self._sift_down(element.index)
         else:
-            element = Element(priority, next(self._counter), unique_value)
+            element = Element(priority, next(self._counter), unique_value, len(self._elements))
             self._elements_by_value[unique_value] = element
-            heappush(self._elements, element)
+            self._elements.append(element)
+            self._sift_up(element.index)
 
     def __getitem__(self, unique_value):
         return self._elements_by_value[unique_value].priority
     
     def dequeue(self):
-        return heappop(self._elements).value
+        elements = self._elements
+        first = elements[0]
+        last = elements.pop()
+        if elements: #moves the last leaf to the root then lets it sink back down, just like heappop()
+            elements[0] = last
+            last.index = 0
+            self._sift_down(0)
+        first.index = -1
+        return first.value
+
+    def _sift_up(self, index):
+        """moves the element at the given slot towards the root while it is smaller than its parent"""
+        elements = self._elements
+        element = elements[index]
+        while index > 0:
+            parent_index = (index - 1) // 2
+            parent = elements[parent_index]
+            if not element < parent:
+                break
+            elements[index] = parent
+            parent.index = index
+            index = parent_index
+        elements[index] = element
+        element.index = index
+
+    def _sift_down(self, index):
+        """moves the element at the given slot towards the leaves while one of its children is smaller"""
+        elements = self._elements
+        size = len(elements)
+        element = elements[index]
+        while (child_index := 2 * index + 1) < size:
+            right_index = child_index + 1
+            if right_index < size and elements[right_index] < elements[child_index]:
+                child_index = right_index
+            child = elements[child_index]
+            if not child < element:
+                break
+            elements[index] = child
+            child.index = index
+            index = child_index
+        elements[index] = element
+        element.index = index
+
+"""Dijkstra's algorithm never asks for a priority smaller than the one it popped last (the heap is "monotone"), and with whole-number edge weights every priority is 
+an integer. The two heaps below take advantage of that to avoid comparing elements at all. They share the interface of MutableMinHeap, including infinite priorities
+(kept aside and handed out last) and reading the priority of an already dequeued value; elements with equal priorities come out in no particular order"""
+class MonotoneIntegerHeap(IterableMixin):
+    def __init__(self):
+        self._priorities = {} #every value ever seen, dequeued ones included
+        self._unreached = {} #values whose priority is still infinity, in insertion order
+        self._size = 0 #values with a finite priority still in the heap
+
+    def __len__(self):
+        return self._size + len(self._unreached)
+
+    def __getitem__(self, unique_value):
+        return self._priorities[unique_value]
+
+    def __setitem__(self, unique_value, priority):
+        in_heap = self._contains(unique_value)
+        if in_heap and unique_value in self._unreached:
+            del self._unreached[unique_value]
+        elif in_heap:
+            self._remove(unique_value)
+            self._size -= 1
+        elif unique_value in self._priorities: #already dequeued, like MutableMinHeap it only remembers the new priority
+            self._priorities[unique_value] = priority
+            return
+        self._priorities[unique_value] = priority
+        if priority == float("inf"):
+            self._unreached[unique_value] = None
+            return
+        key = int(priority)
+        if key != priority or key < 0:
+            raise ValueError(f"priority must be a non-negative whole number, got {priority!r}")
+        self._insert(unique_value, key)
+        self._size += 1
+
+    def dequeue(self):
+        if self._size:
+            self._size -= 1
+            return self._pop_min()
+        if self._unreached:
+            unique_value = next(iter(self._unreached))
+            del self._unreached[unique_value]
+            return unique_value
+        raise IndexError("dequeue from an empty heap")
+
+class DialHeap(MonotoneIntegerHeap):
+    """Dial's bucket queue: a circular array of max_weight + 1 buckets, one per possible priority. While Dijkstra runs, every priority in the heap lies between the 
+    last popped one and that plus the largest edge weight, so priority % (max_weight + 1) never mixes two different priorities in one bucket. Insertion and 
+    decrease-key are O(1), and dequeue only moves a cursor forward to the next non-empty bucket"""
+    def __init__(self, max_weight):
+        super().__init__()
+        self._buckets = [{} for _ in range(max_weight + 1)] #dicts, so a value can be moved to another bucket in O(1)
+        self._cursor = 0 #the smallest priority that can still be in a bucket
+
+    def _contains(self, unique_value):
+        priority = self._priorities.get(unique_value)
+        if priority is None:
+            return False
+        if priority == float("inf"):
+            return unique_value in self._unreached
+        return unique_value in self._buckets[int(priority) % len(self._buckets)]
+
+    def _insert(self, unique_value, key):
+        if key < self._cursor:
+            raise ValueError("priority is smaller than one that was already dequeued")
+        if key - self._cursor >= len(self._buckets): #it would share a bucket with a smaller priority and come out too early
+            raise ValueError(f"priority {key} is more than max_weight above the last dequeued one, {self._cursor}")
+        self._buckets[key % len(self._buckets)][unique_value] = None
+
+    def _remove(self, unique_value):
+        del self._buckets[int(self._priorities[unique_value]) % len(self._buckets)][unique_value]
+
+    def _pop_min(self):
+        buckets = self._buckets
+        while not (bucket := buckets[self._cursor % len(buckets)]):
+            self._cursor += 1
+        unique_value = next(iter(bucket))
+        del bucket[unique_value]
+        return unique_value
+
+class RadixHeap(MonotoneIntegerHeap):
+    """a radix heap puts each priority into the bucket given by the highest bit in which it differs from the last popped priority, (key ^ last).bit_length(). 
+    Bucket 0 therefore holds exactly the values tied with the last minimum; when it runs empty, the first non-empty bucket is emptied into lower buckets around its 
+    own minimum, and every value can only move down a limited number of times. Unlike DialHeap, it doesn't need to know the largest edge weight"""
+    def __init__(self):
+        super().__init__()
+        self._buckets = [{}] #value -> integer priority
+        self._bucket_of = {} #value -> index of the bucket it is in
+        self._last = 0
+
+    def _contains(self, unique_value):
+        return unique_value in self._bucket_of or unique_value in self._unreached
+
+    def _insert(self, unique_value, key):
+        if key < self._last:
+            raise ValueError("priority is smaller than one that was already dequeued")
+        index = (key ^ self._last).bit_length()
+        while len(self._buckets) <= index:
+            self._buckets.append({})
+        self._buckets[index][unique_value] = key
+        self._bucket_of[unique_value] = index
+
+    def _remove(self, unique_value):
+        del self._buckets[self._bucket_of.pop(unique_value)][unique_value]
+
+    def _pop_min(self):
+        buckets = self._buckets
+        if not buckets[0]:
+            index = next(index for index, bucket in enumerate(buckets) if bucket)
+            bucket, buckets[index] = buckets[index], {}
+            self._last = min(bucket.values())
+            for unique_value, key in bucket.items(): #everything lands in a lower bucket than before
+                new_index = (key ^ self._last).bit_length()
+                buckets[new_index][unique_value] = key
+                self._bucket_of[unique_value] = new_index
+        unique_value = next(iter(buckets[0]))
+        del buckets[0][unique_value]
+        del self._bucket_of[unique_value]
+        return unique_value
 
 messages = PriorityQueue() #called the class
 messages.enqueue_with_priority(IMPORTANT, "Windshield wipers turned on") #syntax to calling functions and adding value/argument to the parameter
@@ -0,0 +1,94 @@
+from functools import cache
+from heapq import heappush, heappushpop
+from math import radians, sin, cos, asin, pi
+from graph import EARTH_RADIUS_MILES, load_roadmap
+
+"""Snapping a raw latitude/longitude to the closest City would otherwise mean checking every node of the graph. The k-d tree below splits the cities in half again
+and again, alternating between the coordinate axes, so that a query only needs to look inside the few boxes that could hold something closer than what it has already
+found. Latitude and longitude themselves are a poor fit for that (a degree of longitude shrinks towards the poles and the map wraps around), so every city is turned into
+a point on a unit sphere in 3D first. The straight-line (chord) distance between two such points grows together with the great-circle distance, so the nearest point is
+also the nearest city, and chord lengths convert back to miles exactly."""
+
+def to_point(latitude, longitude):
+    latitude, longitude = radians(latitude), radians(longitude)
+    return (cos(latitude) * cos(longitude), cos(latitude) * sin(longitude), sin(latitude))
+
+def chord_to_miles(chord):
+    return 2 * EARTH_RADIUS_MILES * asin(min(1.0, chord / 2))
+
+def miles_to_chord(miles):
+    return 2 * sin(min(miles / EARTH_RADIUS_MILES, pi) / 2)
+
+class KDNode:
+    __slots__ = ("point", "city", "axis", "left", "right")
+
+    def __init__(self, point, city, axis, left, right):
+        self.point = point
+        self.city = city
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+class CityIndex:
+    def __init__(self, cities):
+        """cities can be any objects with latitude and longitude attributes, e.g. the values of the nodes dictionary returned by load_graph"""
+        self.root = self._build([(to_point(city.latitude, city.longitude), city) for city in cities], 0)
+
+    def _build(self, entries, axis):
+        if not entries:
+            return None
+        entries.sort(key=lambda entry: entry[0][axis])
+        middle = len(entries) // 2 #the median becomes the splitting node, which keeps the tree balanced
+        point, city = entries[middle]
+        next_axis = (axis + 1) % 3
+        return KDNode(point, city, axis, self._build(entries[:middle], next_axis), self._build(entries[middle + 1:], next_axis))
+
+    def nearest(self, latitude, longitude, k=1):
+        """the k cities closest to the coordinates as (distance in miles, city) pairs, closest first"""
+        if k <= 0:
+            return []
+        target = to_point(latitude, longitude)
+        best = [] #max-heap of the k best so far, kept as (-squared distance, tie breaker, city)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            squared = sum((a - b) ** 2 for a, b in zip(node.point, target))
+            entry = (-squared, id(node), node.city)
+            if len(best) < k:
+                heappush(best, entry)
+            elif squared < -best[0][0]:
+                heappushpop(best, entry)
+            difference = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if difference < 0 else (node.right, node.left)
+            if len(best) < k or difference ** 2 < -best[0][0]: #the far side may still hold something closer than the worst of the k best
+                stack.append(far)
+            stack.append(near) #popped first, so good candidates are found early and prune more of the tree
+        return [(chord_to_miles((-squared) ** 0.5), city) for squared, _, city in sorted(best, reverse=True)]
+
+    def within(self, latitude, longitude, radius):
+        """every city at most radius miles away, as (distance in miles, city) pairs, closest first"""
+        target = to_point(latitude, longitude)
+        limit = miles_to_chord(radius) ** 2
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            squared = sum((a - b) ** 2 for a, b in zip(node.point, target))
+            if squared <= limit:
+                found.append((chord_to_miles(squared ** 0.5), node.city))
+            difference = target[node.axis] - node.point[node.axis]
+            stack.append(node.left if difference < 0 else node.right)
+            if difference ** 2 <= limit: #the ball around the target crosses the splitting plane
+                stack.append(node.right if difference < 0 else node.left)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+@cache
+def roadmap_index():
+    """a CityIndex over the cities of the default roadmap, built once next to load_roadmap()"""
+    nodes, _ = load_roadmap()
+    return CityIndex(nodes.values())
@@ -1,8 +1,8 @@
 import networkx as nx
 #allows you to access Switch-specific elements such as buttons, filesystem, etc. via a high-level, object-oriented wrapper around libnx
-from graph import City, load_graph, dijkstra_shortest_path
+from graph import load_roadmap, dijkstra_shortest_path
 
-nodes, graph = load_graph("roadmap.dot", City.from_dict)
+nodes, graph = load_roadmap()
 
 city1 = nodes["london"]
 city2 = nodes["edinburgh"]
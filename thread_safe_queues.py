@@ -1,9 +1,9 @@
 import argparse #makes it easy to write user-friendly command-line interfaces
-from queue import LifoQueue, PriorityQueue, Queue
+from queue import Empty, Full, LifoQueue, PriorityQueue, Queue
 import threading
 from random import choice, randint
-from time import sleep
-from itertools import zip_longest
+from time import monotonic, perf_counter, sleep
+from itertools import islice, zip_longest
 from rich.align import Align
 from rich.columns import Columns
 from rich.console import Group
@@ -33,13 +33,66 @@ Starvation is a problem encountered in concurrent computing where a process is p
  don’t appear to be arranged quite correctly, they’re actually consumed in the right order. Also, because of the non-deterministic nature of multithreaded programming, Python
  queues don’t always report their most up-to-date size."""
 
+#BATCHED FIFO QUEUE
+"""every put() and get() of the queues above takes the queue's lock and wakes up a waiting thread, once per product. With many producers and consumers most of the time
+goes into fighting over that lock. BatchQueue is still a queue.Queue (same lock, conditions and task counting, so join() and the View keep working), but put_many() and
+get_many() move a whole batch of products while taking the lock only once"""
+class BatchQueue(Queue):
+    def put_many(self, items, block=True, timeout=None):
+        """puts every item, in order. A bounded queue (maxsize > 0) that fills up makes it wait for room just like put(); Full is raised if there is still no room after
+        the timeout, and the items put before that stay in the queue"""
+        items = list(items)
+        deadline = None if timeout is None else monotonic() + timeout
+        start = 0
+        with self.not_full:
+            while start < len(items):
+                end = len(items)
+                if self.maxsize > 0:
+                    while self._qsize() >= self.maxsize:
+                        remaining = None if deadline is None else deadline - monotonic()
+                        if not block or (remaining is not None and remaining <= 0):
+                            raise Full
+                        self.not_full.wait(remaining)
+                    end = min(end, start + self.maxsize - self._qsize()) #as many as fit right now
+                for item in items[start:end]:
+                    self._put(item)
+                self.unfinished_tasks += end - start
+                self.not_empty.notify(end - start) #wakes up at most one waiting consumer per item instead of one notify() per put()
+                start = end
+
+    def get_many(self, max_items, block=True, timeout=None):
+        """removes and returns up to max_items items, oldest first. It only waits (like get()) while the queue is empty, and raises Empty if nothing arrives in time"""
+        with self.not_empty:
+            deadline = None if timeout is None else monotonic() + timeout
+            while not self._qsize():
+                remaining = None if deadline is None else deadline - monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise Empty
+                self.not_empty.wait(remaining)
+            items = [self._get() for _ in range(min(max_items, self._qsize()))]
+            self.not_full.notify(len(items))
+            return items
+
+    def task_done(self, count=1):
+        """marks count items as processed at once, so a consumer of a whole batch needs only one call"""
+        with self.all_tasks_done:
+            unfinished = self.unfinished_tasks - count
+            if unfinished < 0:
+                raise ValueError("task_done() called too many times")
+            if unfinished == 0:
+                self.all_tasks_done.notify_all()
+            self.unfinished_tasks = unfinished
+
 """this dictionary maps queue names to their respective classes, which you call to create a new queue instance based on the value of a command-line argument"""
 QUEUE_TYPES = {
     "fifo": Queue,
     "lifo": LifoQueue,
-    "heap": PriorityQueue
+    "heap": PriorityQueue,
+    "batch": BatchQueue
 }
 
+MAX_SHOWN_PRODUCTS = 20 #about two lines of the 82 characters wide queue panel, drawing more products than that is wasted work
+
 PRODUCTS = (
     ":balloon:",
     ":cookie:",
@@ -94,6 +147,11 @@ class Worker(threading.Thread):
         self.product = None
         self.working = False
         self.progress = 0
+        self.on_change = None #set by the View, called whenever something on the screen should change
+
+    def notify(self):
+        if self.on_change:
+            self.on_change()
     
     #@python decorator makes usage of getter and setters much easier in Object-Oriented Programming
     @property
@@ -108,6 +166,7 @@ class Worker(threading.Thread):
         self.product = None
         self.working = False
         self.progress = 0
+        self.notify()
         sleep(randint(1, 3))
 
     def simulate_work(self):
@@ -118,24 +177,38 @@ class Worker(threading.Thread):
         for _ in range(100): #to progress to "100%" completeness
             sleep(delay / 100) #will make it appear as if it is loading
             self.progress += 1 #increment
+            self.notify()
 
 class Producer(Worker):
     """producer thread will extend a Worker class and take an additional collection of products to choose from"""
-    def __init__(self, speed, buffer, products):
+    def __init__(self, speed, buffer, products, batch_size=1):
         super().__init__(speed, buffer)
         self.products = products
+        self.batch_size = batch_size #more than 1 only works with a BatchQueue, which then gets the products batch_size at a time
 
     def run(self):
         """a producer works in an infinite loop, choosing a random product and simulating some work before putting that product onto the queue, called a buffer. It then 
          to sleep for a random period, and when it wakes up again, the process repeats"""
+        batch = []
         while True:
             self.product = choice(self.products) #choice() method, from random module, returns a randomly selected element from the specified sequence
             self.simulate_work()
-            self.buffer.put(self.product)
+            if self.batch_size > 1:
+                batch.append(self.product)
+                if len(batch) == self.batch_size:
+                    self.buffer.put_many(batch) #one lock acquisition for the whole batch
+                    batch = []
+            else:
+                self.buffer.put(self.product)
+            self.notify() #the queue on screen has grown
             self.simulate_idle()
 
 class Consumer(Worker):
     """similar structure with Producer class but more straight-forward """
+    def __init__(self, speed, buffer, batch_size=1):
+        super().__init__(speed, buffer)
+        self.batch_size = batch_size #more than 1 only works with a BatchQueue, up to batch_size products are then taken at once
+
     def run(self):
         while True:
             #get() blocks by default, which will keep the consumer thread stopped and waiting until there’s at least one product in the queue. this way, a waiting consumer 
@@ -143,9 +216,17 @@ class Consumer(Worker):
             #to avoid a deadlock, you can optionally set a timeout on the .get() method by passing a timeout keyword argument with the number of seconds to wait before 
             # giving up
             #deadlock is a concurrency failure mode where a thread or threads wait for a condition that never occurs
-            self.product = self.buffer.get() #get() method returns the value of the item in a dict with the specified key
-            self.simulate_work()
-            self.buffer.task_done() #task_done() marks the task as done
+            if self.batch_size > 1:
+                batch = self.buffer.get_many(self.batch_size) #waits only until there is at least one product, then takes whatever is there (up to batch_size)
+            else:
+                batch = [self.buffer.get()] #get() method returns the value of the item in a dict with the specified key
+            self.notify() #the queue on screen has shrunk
+            for self.product in batch:
+                self.simulate_work()
+                if self.batch_size == 1:
+                    self.buffer.task_done() #task_done() marks the task as done
+            if self.batch_size > 1:
+                self.buffer.task_done(len(batch))
             self.simulate_idle()
 
 #You can increase the number of producers, their speed, or both to see how these changes affect the overall capacity of your system. Because the queue is unbounded, 
@@ -153,49 +234,75 @@ class Consumer(Worker):
 # queue again.
 
 
-"""this class will render the current state of producers, consumers, and the queue ten times a second"""
+"""this class will render the current state of producers, consumers, and the queue at most ten times a second, and only when a worker reports a change"""
 class View:
-    def __init__(self, buffer, producers, consumers):
+    def __init__(self, buffer, producers, consumers, refresh_per_second=10):
         self.buffer = buffer
         self.producers = producers
         self.consumers = consumers
+        self.interval = 1 / refresh_per_second
+        self.changed = threading.Event() #set by the workers through their on_change callback
+        self.cache = {} #title -> (what the panel showed, the panel), so unchanged panels are reused instead of rebuilt
+        for worker in producers + consumers:
+            worker.on_change = self.changed.set
 
     def animate(self):
         #with statement ensures proper acquisition and release of resources
         #screen=True will opt to show a Live display in the “alternate screen” upon setting it on the constructor. this will allow your live display to go full screen and restore the command prompt on exit
-        #By default, the live display will refresh 4 times a second. the refresh rate can be with the refresh_per_second argument on the Live constructor
+        #auto_refresh=False stops rich from redrawing on its own thread; the screen is only refreshed below, right after something has changed
         """from rich module, live display is used to animate parts of the terminal"""
         with Live(
-            self.render(), screen=True, refresh_per_second=10
+            self.render(), screen=True, auto_refresh=False
         ) as live:
             while True:
-                live.update(self.render()) #.update() is useful if the information to display is too dynamic to generate by updating a single renderable
+                if self.changed.wait(timeout=1): #sleeps without using the CPU until a worker reports a change (the timeout keeps Ctrl+C responsive)
+                    self.changed.clear()
+                    live.update(self.render(), refresh=True)
+                    sleep(self.interval) #changes arriving meanwhile are drawn together in the next frame, which caps the frame rate
+
+    def snapshot(self):
+        """copies at most MAX_SHOWN_PRODUCTS products while holding the queue's own lock, so the copy is consistent and the workers are kept waiting only briefly"""
+        with self.buffer.mutex:
+            items = self.buffer.queue
+            match self.buffer:
+                case PriorityQueue():
+                    return [str(item) for item in items[:-MAX_SHOWN_PRODUCTS - 1:-1]], len(items)
+                case LifoQueue():
+                    return list(items[-MAX_SHOWN_PRODUCTS:]), len(items)
+                case _:
+                    return list(islice(reversed(items), MAX_SHOWN_PRODUCTS)), len(items) #the newest products of a FIFO queue are shown first
+
+    def cached(self, title, key, build):
+        """returns the panel drawn for the same key last time, or builds (and remembers) a new one"""
+        if title not in self.cache or self.cache[title][0] != key:
+            self.cache[title] = key, build()
+        return self.cache[title][1]
 
     def render(self):
-        #notice the use of structural pattern matching to set the title and products based on the queue type; match case statement in Python is more powerful and allows for 
+        #notice the use of structural pattern matching to set the title based on the queue type; match case statement in Python is more powerful and allows for 
         #more complicated pattern matching
         match self.buffer:
             case PriorityQueue():
                 title = "Priority Queue"
-                products = map(str, reversed(list(self.buffer.queue))) #map () returns a map object
             case LifoQueue():
                 title = "Stack"
-                products = list(self.buffer.queue)
+            case BatchQueue(): #before Queue(), which it is a subclass of
+                title = "Batch Queue"
             case Queue():
                 title = "Queue"
-                products = reversed(list(self.buffer.queue))
             case _: #equivalent to else in if-elif-else statement
-                title = products = ""
-        
+                title = ""
+        products, size = self.snapshot()
+        hidden = f" (+{size - len(products)} more)" if size > len(products) else ""
         rows = [
-            Panel(f"[bold]{title}:[/] {', '.join(products)}", width=82)
+            self.cached("queue", (products, size), lambda: Panel(f"[bold]{title}:[/] {', '.join(products)}{hidden}", width=82))
         ] #Panel(), from rich module, is a console renderable that draws aborder around its contents
         #zip_longest function (from iteratools module) falls under the category of Terminating Iterators. It prints the values of iterables alternatively in sequence. If one 
         # of the iterables is printed fully, the remaining values are filled by the values assigned to fillvalue parameter.
         pairs = zip_longest(self.producers, self.consumers) 
         for i, (producer, consumer) in enumerate(pairs, 1):
-            left_panel = self.panel(producer, f"Producer {i}")
-            right_panel = self.panel(consumer, f"Consumer {i}")
+            left_panel = self.cached(f"Producer {i}", producer and producer.state, lambda: self.panel(producer, f"Producer {i}"))
+            right_panel = self.cached(f"Consumer {i}", consumer and consumer.state, lambda: self.panel(consumer, f"Consumer {i}"))
             rows.append(Columns([left_panel, right_panel], width=40)) #Columns(), from rich module, displays renderables in neat columns
         return Group(*rows) #Group(), from rich module, takes a group of renderables (group of rows in this case) and returns a renderable object that renders the group
     
@@ -209,23 +316,150 @@ class View:
         ) #Align function also from rich module aligns renderable by adding space if necessary
         return Panel(align, height=5, title=title)
 
+#HEADLESS BENCHMARK
+"""the animation above sleeps for seconds on purpose so that a human can follow it, which says nothing about how fast the queues really are. The benchmark mode runs the
+same producers and consumers without rich, with no delay at all (or a fixed synthetic one), for a fixed number of seconds, and measures what got through"""
+@dataclass(order=True)
+class TimedProduct:
+    priority: int #only used for ordering by the heap queue
+    enqueued: float = field(compare=False) #perf_counter() when the producer put it into the queue
+    product: object = field(compare=False)
+
+class BenchmarkProducer(Producer):
+    def __init__(self, speed, buffer, products, delay, stopped, batch_size=1):
+        super().__init__(speed, buffer, products, batch_size)
+        self.delay = delay
+        self.stopped = stopped #a threading.Event set when the benchmark is over
+        self.produced = 0
+
+    def run(self):
+        while not self.stopped.is_set():
+            batch = []
+            for _ in range(self.batch_size):
+                self.product = choice(self.products)
+                if self.delay:
+                    sleep(self.delay)
+                batch.append(self.product)
+            enqueued = perf_counter()
+            batch = [TimedProduct(getattr(product, "priority", 0), enqueued, product) for product in batch]
+            if self.batch_size > 1:
+                self.buffer.put_many(batch)
+            else:
+                self.buffer.put(batch[0])
+            self.produced += len(batch)
+
+class BenchmarkConsumer(Consumer):
+    def __init__(self, speed, buffer, delay, stopped, batch_size=1):
+        super().__init__(speed, buffer, batch_size)
+        self.delay = delay
+        self.stopped = stopped
+        self.latencies = [] #seconds between put() and get() of every product this consumer took
+
+    def run(self):
+        while not self.stopped.is_set():
+            try: #a timeout, so that the thread notices when the benchmark stops
+                if self.batch_size > 1:
+                    batch = self.buffer.get_many(self.batch_size, timeout=0.1)
+                else:
+                    batch = [self.buffer.get(timeout=0.1)]
+            except Empty:
+                continue
+            taken = perf_counter()
+            for item in batch:
+                self.latencies.append(taken - item.enqueued)
+                if self.delay:
+                    sleep(self.delay)
+            if self.batch_size > 1:
+                self.buffer.task_done(len(batch))
+            else:
+                self.buffer.task_done()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def benchmark(queue_name, args):
+    """runs one queue type for args.benchmark seconds and returns a dictionary of measurements; the queue depth is sampled every 10 milliseconds. The queue holds at
+    most args.maxsize products, so producers that are faster than the consumers wait for room instead of piling up a backlog that grows for as long as the run lasts,
+    and the latencies (which include that wait) describe a steady state rather than the length of the run. Each worker's synthetic work is args.work_delay divided by
+    its speed, just like a faster worker of the animation finishes its products sooner"""
+    buffer = QUEUE_TYPES[queue_name](maxsize=args.maxsize)
+    products = PRIORITIZED_PRODUCTS if queue_name == "heap" else PRODUCTS
+    batch_size = args.batch_size if queue_name == "batch" else 1
+    stopped = threading.Event()
+    producers = [
+        BenchmarkProducer(args.producer_speed, buffer, products, args.work_delay / args.producer_speed, stopped, batch_size)
+        for _ in range(args.producers)
+    ]
+    consumers = [
+        BenchmarkConsumer(args.consumer_speed, buffer, args.work_delay / args.consumer_speed, stopped, batch_size) for _ in range(args.consumers)
+    ]
+    depths = []
+    start = perf_counter()
+    for worker in producers + consumers:
+        worker.start()
+    while (elapsed := perf_counter() - start) < args.benchmark:
+        depths.append(buffer.qsize())
+        sleep(0.01)
+    stopped.set()
+    for consumer in consumers:
+        consumer.join()
+    while any(producer.is_alive() for producer in producers): #producers waiting for room in a full queue only notice the stop once they get it
+        try:
+            buffer.get(timeout=0.01)
+            buffer.task_done()
+        except Empty:
+            pass
+    for producer in producers:
+        producer.join()
+    latencies = sorted(latency for consumer in consumers for latency in consumer.latencies)
+    return {
+        "queue": queue_name,
+        "produced": sum(producer.produced for producer in producers),
+        "consumed": len(latencies),
+        "items_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "depth_average": sum(depths) / len(depths) if depths else 0,
+        "depth_max": max(depths, default=0),
+        "depths": depths,
+    }
+
+def print_benchmark(results):
+    print(f"{'queue':<8}{'items/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'avg depth':>11}{'max depth':>11}")
+    for result in results:
+        print(
+            f"{result['queue']:<8}{result['items_per_second']:>12,.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"{result['depth_average']:>11.1f}{result['depth_max']:>11}"
+        )
+    for result in results: #ten evenly spaced samples show whether the queue keeps growing or stays level
+        depths = result["depths"]
+        samples = [depths[index * len(depths) // 10] for index in range(10)] if depths else []
+        print(f"{result['queue']:<8}depth over time: {' '.join(map(str, samples))}")
+
 """producers will always push their finished products through the queue to the consumers. Even though it may sometimes appear as if a consumer takes an element directly from 
 a producer, it’s only because things are happening too fast to notice the enqueue and dequeue operations"""
 def main(args):
     """this function is the entry point which receives the parsed arguments (thru argparse module) supplied by parse_args()"""
     """the number of producers and consumers is determined by the command-line arguments passed into your function. They’ll begin working and using the queue for interthread 
     communication as soon as you start them."""
-    buffer = QUEUE_TYPES[args.queue]()
+    if args.benchmark:
+        print_benchmark([benchmark(name, args) for name in ([args.queue] if args.queue else QUEUE_TYPES)]) #every queue type unless one was chosen
+        return
+    queue_name = args.queue or "fifo"
+    buffer = QUEUE_TYPES[queue_name]()
     #when the user supplies the --queue heap option in the command line, the program will supply the right collection of products to the producer threads
-    products = PRIORITIZED_PRODUCTS if args.queue == "heap" else PRODUCTS
+    products = PRIORITIZED_PRODUCTS if queue_name == "heap" else PRODUCTS
+    batch_size = args.batch_size if queue_name == "batch" else 1 #only the batch queue has put_many() and get_many()
     producers = [
-        Producer(args.producer_speed, buffer, products)
+        Producer(args.producer_speed, buffer, products, batch_size)
         #for _ in range is used when there is no interest in values returned by a function--underscore in place of variable name. basically, there is no interest in how many 
         # times the loop is run, just that it should run some specific number of times overall
         for _ in range(args.producers)
     ]
     consumers = [
-        Consumer(args.consumer_speed, buffer) for _ in range(args.consumers)
+        Consumer(args.consumer_speed, buffer, batch_size) for _ in range(args.consumers)
     ]
 
     for producer in producers:
@@ -241,11 +475,15 @@ def main(args):
 def parse_args():
     """this function supplies parsed arguments"""
     parser = argparse.ArgumentParser() #argparse.ArgumentParser() is a container for argument specifications and has options that apply the parser as whole
-    parser.add_argument("-q", "--queue", choices=QUEUE_TYPES, default="fifo") #.add_argument method attaches individual argument specifications to the parser. It supports positional arguments, options that accept values, and on/off flags
+    parser.add_argument("-q", "--queue", choices=QUEUE_TYPES) #fifo when left out, except for the benchmark which then compares all of them; .add_argument method attaches individual argument specifications to the parser. It supports positional arguments, options that accept values, and on/off flags
     parser.add_argument("-p", "--producers", type=int, default=3)
     parser.add_argument("-c", "--consumers", type=int, default=2)
     parser.add_argument("-ps", "--producer-speed", type=int, default=4)
     parser.add_argument("-cs", "--consumer-speed", type=int, default=1)
+    parser.add_argument("-bs", "--batch-size", type=int, default=1, help="products moved per put_many()/get_many() when --queue batch is used")
+    parser.add_argument("-b", "--benchmark", type=float, metavar="SECONDS", help="run headless for this many seconds and report throughput, latency and queue depth")
+    parser.add_argument("-wd", "--work-delay", type=float, default=0, metavar="SECONDS", help="synthetic work per product in benchmark mode, divided by the worker's speed")
+    parser.add_argument("-m", "--maxsize", type=int, default=100, help="capacity of the queue in benchmark mode, 0 for unbounded")
     return parser.parse_args()
 
 if __name__ == "__main__":